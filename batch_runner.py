@@ -0,0 +1,203 @@
+"""
+Batch Runner
+
+This program runs one of the three programs over many TXT input files in
+a single command. Inputs can be files, glob patterns or directories; they
+are processed by a bounded pool of worker processes, every input gets its
+own results file in the output directory, and a summary with the timing
+of every file is printed at the end
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import argparse
+import glob
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from compute_statistics import ComputeStatistics
+from convert_numbers import ConvertNumbers
+from result_writer import OutputOptions
+from word_count import WordCount
+
+PROGRAMS = {
+    'statistics': (ComputeStatistics, 'StatisticsResults'),
+    'convert': (ConvertNumbers, 'ConvertionResults'),
+    'wordcount': (WordCount, 'WordCountResults'),
+}
+
+
+def expand_inputs(inputs):
+    """
+    This function expands the inputs given on the command line into a list
+    of files. Directories contribute their TXT files and glob patterns the
+    files they match, both in name order. Repeated files are kept once,
+    also when they are reached through different paths or links
+
+    Args:
+        inputs (iterable): Paths of files or directories, or glob patterns
+
+    Returns:
+        list: Paths of the input files, in the order they were given
+    """
+    file_paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            matches = sorted(glob.glob(os.path.join(entry, '*.txt')))
+        elif glob.has_magic(entry):
+            matches = sorted(path for path in glob.glob(entry) if os.path.isfile(path))
+        else:
+            matches = [entry]
+        file_paths.extend(matches)
+    unique_paths = {}
+    for file_path in file_paths:
+        unique_paths.setdefault(os.path.realpath(file_path), file_path)
+    return list(unique_paths.values())
+
+
+def output_paths(file_paths, output_dir, results_name):
+    """
+    This function names the results file of every input after the input
+    file, adding a numeric suffix when two inputs share the same name
+
+    Args:
+        file_paths (list): Paths of the input files
+        output_dir (str): Directory of the results files
+        results_name (str): Name of the results of the program, e.g.
+        'StatisticsResults'
+
+    Returns:
+        list: Paths of the results files, one per input
+    """
+    used_names = set()
+    paths = []
+    for file_path in file_paths:
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        name = f'{stem}.{results_name}.txt'
+        suffix = 1
+        while name in used_names:
+            suffix += 1
+            name = f'{stem}_{suffix}.{results_name}.txt'
+        used_names.add(name)
+        paths.append(os.path.join(output_dir, name))
+    return paths
+
+
+def run_program(program, file_path, output_path):
+    """
+    Runs a program over one input file. Runs inside the worker processes of
+    the pool, with the console output of the program captured. Any error
+    raised by the program fails this input only: its partial results file
+    is removed and the error is reported in the summary
+
+    Args:
+        program (str): Name of the program, a key of PROGRAMS
+        file_path (str): Path of the TXT input file
+        output_path (str): Path of the results file
+
+    Returns:
+        dict: The input and output paths, the input size in bytes and
+        lines, the seconds spent, and whether the results file was written
+        together with the last console line when it was not
+    """
+    program_class = PROGRAMS[program][0]
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    console = io.StringIO()
+    start_time = time.perf_counter()
+    processor = program_class(file_path, output=OutputOptions(output_path, echo='none'))
+    failed = False
+    with redirect_stdout(console):
+        try:
+            processor.process_txt_file()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            failed = True
+            print(f'{type(error).__name__}: {error}')
+    seconds = time.perf_counter() - start_time
+
+    if failed and os.path.exists(output_path):
+        os.remove(output_path)
+    written = os.path.exists(output_path)
+    messages = console.getvalue().splitlines()
+    return {
+        'input': file_path,
+        'output': output_path,
+        'bytes': os.path.getsize(file_path) if os.path.isfile(file_path) else 0,
+        'lines': processor.total_lines or 0,
+        'seconds': seconds,
+        'written': written,
+        'message': '' if written or not messages else messages[-1],
+    }
+
+
+def report_summary(results, elapsed_time):
+    """
+    This function prints the timing of every input and the throughput of
+    the whole batch
+
+    Args:
+        results (list): The results of 'run_program', in input order
+        elapsed_time (float): Wall-clock time of the whole batch, in seconds
+
+    Returns:
+        None
+    """
+    for result in results:
+        if result['written']:
+            print(f'{result["input"]}: {result["lines"]} lines in {result["seconds"]:.3f} s '
+                  f'-> {result["output"]}')
+        else:
+            print(f'{result["input"]}: no results written '
+                  f'({result["message"] or "no valid lines"})')
+
+    total_bytes = sum(result['bytes'] for result in results)
+    total_lines = sum(result['lines'] for result in results)
+    failed = sum(not result['written'] for result in results)
+    elapsed_time = max(elapsed_time, 1e-9)
+    print(f'\nProcessed {len(results)} files ({failed} without results), '
+          f'{total_lines} lines, {total_bytes} bytes\n'
+          f'\nThroughput: {len(results) / elapsed_time:.1f} files/s, '
+          f'{total_lines / elapsed_time:.0f} lines/s, '
+          f'{total_bytes / elapsed_time / 1_048_576:.1f} MB/s\n'
+          f'\nElapsed Time: {elapsed_time} s')
+
+
+def main():
+    """
+    Parses the command line arguments and runs the program
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        prog='python3 batch_runner.py',
+        description='Runs compute_statistics, convert_numbers or word_count over many '
+                    'TXT input files')
+    parser.add_argument('program', choices=PROGRAMS, help='program run over every input')
+    parser.add_argument('inputs', nargs='+',
+                        help='TXT input files, glob patterns or directories of TXT files')
+    parser.add_argument('--output-dir', default='results',
+                        help='directory of the results files (default: results)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='input files processed at the same time '
+                             '(default: number of CPUs)')
+    args = parser.parse_args()
+
+    file_paths = expand_inputs(args.inputs)
+    if not file_paths:
+        parser.error('no input files found')
+    os.makedirs(args.output_dir, exist_ok=True)
+    paths = output_paths(file_paths, args.output_dir, PROGRAMS[args.program][1])
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        results = list(executor.map(run_program, [args.program] * len(file_paths),
+                                    file_paths, paths))
+    report_summary(results, time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    main()
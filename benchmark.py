@@ -0,0 +1,561 @@
+"""
+Benchmark
+
+This program measures the three programs on reproducible synthetic inputs.
+Every pipeline stage (counting the lines, parsing, computing and writing)
+is timed separately over several repetitions, and the median and 99th
+percentile of each stage, the throughput and the peak resident memory are
+reported as JSON. A previous report can be given as a baseline to flag
+the cases that got slower
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from itertools import accumulate
+
+from compute_statistics import ComputeStatistics
+from convert_numbers import ConvertNumbers
+from order_statistics import SortedView
+from result_writer import OutputOptions
+from statistics_pipeline import StatisticsState
+from text_input import LineScanner
+from word_count import WordCount
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+GENERATION_BATCH = 100_000
+ZIPF_VOCABULARY = 50_000
+ZIPF_EXPONENT = 1.1
+DIRTY_VALUES = ('', 'abc', '1,5', '--3', '0x1F', '1.2.3', 'N/A')
+TOOL_DATASETS = {
+    'statistics': ('uniform', 'skewed', 'dirty'),
+    'convert': ('negative', 'dirty-ints'),
+    'wordcount': ('zipf',),
+}
+
+
+def uniform_lines(rng, count):
+    """
+    This function generates floats drawn uniformly between -1000 and 1000
+
+    Args:
+        rng (random.Random): The seeded generator
+        count (int): Number of lines
+
+    Returns:
+        generator: The lines, without line endings
+    """
+    for _ in range(count):
+        yield repr(rng.uniform(-1000, 1000))
+
+
+def skewed_lines(rng, count):
+    """
+    This function generates log-normal floats rounded to two decimals, so
+    many values repeat and a few are very large
+
+    Args:
+        rng (random.Random): The seeded generator
+        count (int): Number of lines
+
+    Returns:
+        generator: The lines, without line endings
+    """
+    for _ in range(count):
+        yield f'{rng.lognormvariate(0, 1.5):.2f}'
+
+
+def dirty_lines(rng, count):
+    """
+    This function generates floats mixed with one invalid or empty line out
+    of ten, and with stray whitespace around some of the values
+
+    Args:
+        rng (random.Random): The seeded generator
+        count (int): Number of lines
+
+    Returns:
+        generator: The lines, without line endings
+    """
+    for _ in range(count):
+        draw = rng.random()
+        if draw < 0.1:
+            yield rng.choice(DIRTY_VALUES)
+        elif draw < 0.2:
+            yield f'  {rng.uniform(-1000, 1000):.3f} '
+        else:
+            yield f'{rng.uniform(-1000, 1000):.3f}'
+
+
+def negative_lines(rng, count):
+    """
+    This function generates negative integers from 1 to 100 bits wide, so
+    some of them do not fit in 64 bits
+
+    Args:
+        rng (random.Random): The seeded generator
+        count (int): Number of lines
+
+    Returns:
+        generator: The lines, without line endings
+    """
+    for _ in range(count):
+        yield str(-rng.getrandbits(rng.randint(1, 100)) - 1)
+
+
+def dirty_int_lines(rng, count):
+    """
+    This function generates integers of both signs mixed with one invalid
+    or empty line out of ten
+
+    Args:
+        rng (random.Random): The seeded generator
+        count (int): Number of lines
+
+    Returns:
+        generator: The lines, without line endings
+    """
+    for _ in range(count):
+        if rng.random() < 0.1:
+            yield rng.choice(DIRTY_VALUES)
+        else:
+            yield str(rng.randint(-10 ** 6, 10 ** 6))
+
+
+def zipf_lines(rng, count):
+    """
+    This function generates one word per line, drawn from a fixed
+    vocabulary with Zipfian frequencies
+
+    Args:
+        rng (random.Random): The seeded generator
+        count (int): Number of lines
+
+    Returns:
+        generator: The lines, without line endings
+    """
+    vocabulary = [f'word{rank}' for rank in range(1, ZIPF_VOCABULARY + 1)]
+    cum_weights = list(accumulate(1 / rank ** ZIPF_EXPONENT
+                                  for rank in range(1, ZIPF_VOCABULARY + 1)))
+    while count > 0:
+        batch = min(count, GENERATION_BATCH)
+        yield from rng.choices(vocabulary, cum_weights=cum_weights, k=batch)
+        count -= batch
+
+
+GENERATORS = {
+    'uniform': uniform_lines,
+    'skewed': skewed_lines,
+    'dirty': dirty_lines,
+    'negative': negative_lines,
+    'dirty-ints': dirty_int_lines,
+    'zipf': zipf_lines,
+}
+
+
+def generate_input(dataset, lines, seed, data_dir):
+    """
+    This function writes a synthetic input file, reusing it when it was
+    already generated with the same dataset, size and seed
+
+    Args:
+        dataset (str): Name of the dataset, a key of GENERATORS
+        lines (int): Number of lines
+        seed (int): Seed of the generator
+        data_dir (str): Directory of the generated files
+
+    Returns:
+        str: Path of the input file
+    """
+    file_path = os.path.join(data_dir, f'{dataset}_{lines}_{seed}.txt')
+    if os.path.exists(file_path):
+        return file_path
+    rng = random.Random(f'{dataset}-{seed}')
+    temporary_path = f'{file_path}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        batch = []
+        for line in GENERATORS[dataset](rng, lines):
+            batch.append(line)
+            if len(batch) >= GENERATION_BATCH:
+                file.write('\n'.join(batch) + '\n')
+                batch = []
+        if batch:
+            file.write('\n'.join(batch) + '\n')
+    os.replace(temporary_path, file_path)
+    return file_path
+
+
+def time_stage(timings, stage, function, *args):
+    """
+    This function runs a stage of a pipeline and records its duration
+
+    Args:
+        timings (dict): Durations of every stage, in seconds
+        stage (str): Name of the stage
+        function (callable): The stage
+        *args: Arguments of the stage
+
+    Returns:
+        The value returned by the stage
+    """
+    start_time = time.perf_counter()
+    value = function(*args)
+    timings.setdefault(stage, []).append(time.perf_counter() - start_time)
+    return value
+
+
+def run_statistics(file_path, output_path, timings):
+    """
+    This function runs the stages of 'ComputeStatistics' once
+
+    Args:
+        file_path (str): Path of the input file
+        output_path (str): Path of the results file
+        timings (dict): Durations of every stage, in seconds
+
+    Returns:
+        None
+    """
+    processor = ComputeStatistics(file_path, output=OutputOptions(output_path, echo='none'))
+    with LineScanner(file_path) as scanner:
+        processor.total_lines = time_stage(timings, 'count', scanner.count_lines)
+        num_list = time_stage(timings, 'parse', processor.store_nums, scanner.iter_lines())
+    state = StatisticsState(num_list)
+    statistics = time_stage(timings, 'compute', state.compute, processor.report.metrics)
+    time_stage(timings, 'write', processor.report_statistics,
+               processor.total_lines - state.count, statistics, 0.0)
+
+
+def run_convert(file_path, output_path, timings):
+    """
+    This function runs the stages of 'ConvertNumbers' once
+
+    Args:
+        file_path (str): Path of the input file
+        output_path (str): Path of the results file
+        timings (dict): Durations of every stage, in seconds
+
+    Returns:
+        None
+    """
+    processor = ConvertNumbers(file_path, output=OutputOptions(output_path, echo='none'))
+    with LineScanner(file_path) as scanner:
+        processor.total_lines = time_stage(timings, 'count', scanner.count_lines)
+        num_list = time_stage(timings, 'parse', processor.store_nums, scanner.iter_lines())
+    time_stage(timings, 'convert', processor.convert_numbers, num_list)
+
+
+def run_wordcount(file_path, output_path, timings):
+    """
+    This function runs the stages of 'WordCount' once
+
+    Args:
+        file_path (str): Path of the input file
+        output_path (str): Path of the results file
+        timings (dict): Durations of every stage, in seconds
+
+    Returns:
+        None
+    """
+    processor = WordCount(file_path, output=OutputOptions(output_path, echo='none'))
+    with LineScanner(file_path) as scanner:
+        processor.total_lines = time_stage(timings, 'count', scanner.count_lines)
+        word_counts = time_stage(timings, 'count_words', processor.count_words,
+                                 scanner.iter_lines())
+    time_stage(timings, 'write', processor.word_count, word_counts, time.time())
+
+
+RUNNERS = {
+    'statistics': run_statistics,
+    'convert': run_convert,
+    'wordcount': run_wordcount,
+}
+
+
+def peak_rss_mb():
+    """
+    This function returns the peak resident memory of the current process
+
+    Returns:
+        float|None: The peak in megabytes, or None where the 'resource'
+        module is not available
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1_048_576 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(tool, file_path, repeat):
+    """
+    Runs the stages of a program several times over an input file. Runs in
+    a fresh worker process, so the peak memory belongs to this case only
+
+    Args:
+        tool (str): Name of the program, a key of RUNNERS
+        file_path (str): Path of the input file
+        repeat (int): Number of repetitions
+
+    Returns:
+        dict: The durations of every stage and repetition, in seconds, and
+        the peak resident memory in megabytes
+    """
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix='benchmark_') as output_dir, \
+            redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            RUNNERS[tool](file_path, os.path.join(output_dir, 'results.txt'), timings)
+            timings.setdefault('total', []).append(time.perf_counter() - start_time)
+    return {'timings': timings, 'peak_rss_mb': peak_rss_mb()}
+
+
+def summarize_case(tool, dataset, lines, file_path, measured):
+    """
+    This function turns the measured durations of a case into its report
+
+    Args:
+        tool (str): Name of the program
+        dataset (str): Name of the dataset
+        lines (int): Number of lines of the input
+        file_path (str): Path of the input file
+        measured (dict): The value returned by 'run_case'
+
+    Returns:
+        dict: The report of the case
+    """
+    stages = {}
+    for stage, durations in measured['timings'].items():
+        ordered = SortedView(durations)
+        stages[stage] = {'p50': ordered.median(), 'p99': ordered.percentile(99)}
+    total = max(stages['total']['p50'], 1e-9)
+    input_bytes = os.path.getsize(file_path)
+    return {
+        'tool': tool,
+        'dataset': dataset,
+        'lines': lines,
+        'bytes': input_bytes,
+        'repeat': len(measured['timings']['total']),
+        'stages': stages,
+        'lines_per_s': lines / total,
+        'mb_per_s': input_bytes / total / 1_048_576,
+        'peak_rss_mb': measured['peak_rss_mb'],
+    }
+
+
+def compare_with_baseline(cases, baseline, tolerance):
+    """
+    This function compares the median total time of every case with the
+    same case of a baseline report
+
+    Args:
+        cases (list): The reports of the current cases
+        baseline (dict): A report previously written by this program
+        tolerance (float): Accepted slowdown, e.g. 0.1 for 10%
+
+    Returns:
+        list: The comparisons, with the baseline and current times and
+        whether the case regressed
+    """
+    baseline_cases = {(case['tool'], case['dataset'], case['lines']): case
+                      for case in baseline.get('cases', [])}
+    comparisons = []
+    for case in cases:
+        previous = baseline_cases.get((case['tool'], case['dataset'], case['lines']))
+        if previous is None:
+            continue
+        before = previous['stages']['total']['p50']
+        after = case['stages']['total']['p50']
+        comparisons.append({
+            'tool': case['tool'],
+            'dataset': case['dataset'],
+            'lines': case['lines'],
+            'baseline_p50': before,
+            'current_p50': after,
+            'change': after / before - 1 if before else 0.0,
+            'regressed': after > before * (1 + tolerance),
+        })
+    return comparisons
+
+
+def iter_cases(tools, sizes):
+    """
+    This function lists the cases to benchmark: every dataset of every
+    selected program, at every line count
+
+    Args:
+        tools (list): Names of the programs, keys of RUNNERS
+        sizes (list): Line counts of the generated inputs
+
+    Returns:
+        generator: Tuples of (tool, dataset, lines)
+    """
+    for tool in tools:
+        for dataset in TOOL_DATASETS[tool]:
+            for lines in sizes:
+                yield tool, dataset, lines
+
+
+def run_cases(cases, repeat, seed, data_dir=None):
+    """
+    Generates the input of every case and runs it in its own worker
+    process
+
+    Args:
+        cases (iterable): Tuples of (tool, dataset, lines)
+        repeat (int): Repetitions of every case
+        seed (int): Seed of the generated inputs
+        data_dir (str): Directory where the generated inputs are kept and
+        reused, or None for a temporary directory
+
+    Returns:
+        list: The report of every case
+    """
+    reports = []
+    with tempfile.TemporaryDirectory(prefix='benchmark_data_') as temporary_dir:
+        data_dir = data_dir or temporary_dir
+        os.makedirs(data_dir, exist_ok=True)
+        for tool, dataset, lines in cases:
+            file_path = generate_input(dataset, lines, seed, data_dir)
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                measured = executor.submit(run_case, tool, file_path, repeat).result()
+            reports.append(summarize_case(tool, dataset, lines, file_path, measured))
+    return reports
+
+
+def build_report(cases, seed, baseline_path=None, tolerance=0.1):
+    """
+    This function builds the JSON report of a run, comparing it with a
+    baseline report when one is given
+
+    Args:
+        cases (list): The reports of the cases
+        seed (int): Seed of the generated inputs
+        baseline_path (str): Path of a previous report, or None
+        tolerance (float): Accepted slowdown against the baseline
+
+    Returns:
+        dict: The report
+    """
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'cases': cases,
+    }
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as file:
+            report['comparison'] = compare_with_baseline(cases, json.load(file), tolerance)
+    return report
+
+
+def write_report(report, output_path=None):
+    """
+    This function writes the report as JSON and reports the cases slower
+    than the baseline on standard error
+
+    Args:
+        report (dict): The value returned by 'build_report'
+        output_path (str): File the report is written to, or None for
+        standard output
+
+    Returns:
+        list: The comparisons of the regressed cases
+    """
+    report_text = json.dumps(report, indent=2)
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as file:
+            file.write(report_text + '\n')
+    else:
+        print(report_text)
+
+    regressions = [item for item in report.get('comparison', []) if item['regressed']]
+    for item in regressions:
+        print(f'Regression: {item["tool"]} on {item["dataset"]} x {item["lines"]} lines '
+              f'is {item["change"]:.1%} slower', file=sys.stderr)
+    return regressions
+
+
+def parse_sizes(value):
+    """
+    This function parses a comma-separated list of line counts. Counts can
+    be written as powers of ten, e.g. '1e3,1e5'
+
+    Args:
+        value (str): The comma-separated counts
+
+    Returns:
+        list: The line counts
+
+    Raises:
+        argparse.ArgumentTypeError: If a count is not a positive integer
+    """
+    sizes = []
+    for item in value.split(','):
+        try:
+            size = int(float(item))
+        except ValueError:
+            size = 0
+        if size <= 0:
+            raise argparse.ArgumentTypeError(f'Invalid line count: {item}')
+        sizes.append(size)
+    return sizes
+
+
+def main():
+    """
+    Parses the command line arguments and runs the program
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        prog='python3 benchmark.py',
+        description='Benchmarks the three programs on synthetic inputs')
+    parser.add_argument('--tools', default=','.join(RUNNERS),
+                        help=f'comma-separated programs out of {", ".join(RUNNERS)} '
+                             '(default: all)')
+    parser.add_argument('--lines', type=parse_sizes, default=[1_000, 100_000],
+                        help='comma-separated line counts, e.g. 1e3,1e6 (default: 1e3,1e5)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='repetitions of every case (default: 5)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the generated inputs (default: 0)')
+    parser.add_argument('--data-dir', default=None,
+                        help='directory where the generated inputs are kept and reused '
+                             '(default: a temporary directory)')
+    parser.add_argument('--output', default=None,
+                        help='file the JSON report is written to (default: standard output)')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON report of a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='accepted slowdown against the baseline (default: 0.1)')
+    args = parser.parse_args()
+
+    tools = [tool.strip() for tool in args.tools.split(',')]
+    unknown = [tool for tool in tools if tool not in RUNNERS]
+    if unknown:
+        parser.error(f'unknown tools: {", ".join(unknown)}')
+
+    cases = run_cases(iter_cases(tools, args.lines), args.repeat, args.seed, args.data_dir)
+    report = build_report(cases, args.seed, args.baseline, args.tolerance)
+    if write_report(report, args.output):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,265 @@ results into a TXT output file
 Author:
     Julia Gabriela Pinedo (A01795315)
 """
-import sys
+import argparse
+import json
 import time
+from array import array
+from functools import partial
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy_backend
+from frequency_index import format_mode
+from instrumentation import Instrumentation
+from numeric_parser import BATCH_LINES, FLOAT_PARSER, SAMPLE_LINES, RejectLog
+from order_statistics import histogram
+from result_writer import OutputOptions
+from state_snapshot import load_snapshot, save_snapshot
+from statistics_pipeline import (DEFAULT_METRICS, HISTOGRAM_BINS, METRIC_LABELS, ORDER_METRICS,
+                                 PERCENTILES, POWER_SUM_METRICS, StatisticsState,
+                                 format_statistic, integral, parse_metrics, parse_range)
+from streaming_statistics import PartialStatistics, PowerSums, RunningMoments, SpillingSorter
+from text_input import LineScanner, split_byte_ranges
+
+PROCESSING_MODES = ('memory', 'stream', 'approximate', 'incremental')
+
+
+class ProcessingOptions:
+    """
+    Class to hold how ComputeStatistics reads its input: the processing
+    mode together with the settings of the streaming, parallel and
+    approximate modes
+    """
+
+    def __init__(self, mode='memory', workers=1, chunk_size=1_048_576,
+                 spill_threshold=1_000_000, error_bounds=(0.01, 0.001)):
+        """
+        Initializes the ProcessingOptions object
+
+        Args:
+            mode (str): One of PROCESSING_MODES. 'memory' loads every value,
+            'stream' reads the file in chunks with constant memory,
+            'approximate' computes the median and mode from mergeable
+            bounded-memory sketches instead of exact structures, and
+            'incremental' resumes from the snapshot saved next to the input
+            by a previous run and only reads the lines appended since then,
+            taking the order statistics from the sketches
+            workers (int): Number of processes used to parse the file. More
+            than one splits the file into byte ranges parsed in parallel
+            chunk_size (int): Approximate number of bytes split into lines
+            at once in streaming mode
+            spill_threshold (int): Number of values kept in memory in
+            streaming mode before they are spilled to disk for the
+            median and mode
+            error_bounds (tuple): Accepted rank error of the approximate
+            median and accepted overcount of the approximate mode, both as
+            a fraction of the values
+
+        Returns:
+            None
+        """
+        if mode not in PROCESSING_MODES:
+            raise ValueError(f'Unknown processing mode: {mode}')
+        self.mode = mode
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.spill_threshold = spill_threshold
+        self.error_bounds = error_bounds
+
+    @property
+    def sketch_errors(self):
+        """
+        This function returns the accepted errors the sketches are sized
+        for, which are only built in approximate mode
+
+        Returns:
+            tuple: The (quantile_error, mode_error), or (None, None) when the
+            median and mode are exact
+        """
+        if self.mode == 'approximate':
+            return self.error_bounds
+        return None, None
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """
+        This function adds the processing options to a command line parser
+
+        Args:
+            parser (argparse.ArgumentParser): The parser of the program
+
+        Returns:
+            None
+        """
+        parser.add_argument('--stream', action='store_true',
+                            help='read the file in chunks with constant memory')
+        parser.add_argument('--chunk-size', type=int, default=1_048_576,
+                            help='approximate bytes split into lines at once in streaming mode')
+        parser.add_argument('--spill-threshold', type=int, default=1_000_000,
+                            help='values kept in memory before spilling to disk '
+                                 'in streaming mode')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='processes used to parse the file in parallel (default: 1)')
+        parser.add_argument('--incremental', action='store_true',
+                            help='resume from the snapshot saved next to the input '
+                                 'and only read the appended lines; the median, mode, '
+                                 'percentiles and histogram come from the sketches of '
+                                 '--approximate')
+        parser.add_argument('--approximate', action='store_true',
+                            help='compute the median and mode from bounded-memory sketches')
+        parser.add_argument('--quantile-error', type=float, default=0.01,
+                            help='accepted rank error of the approximate median '
+                                 '(default: 0.01)')
+        parser.add_argument('--mode-error', type=float, default=0.001,
+                            help='accepted overcount of the approximate mode, as a '
+                                 'fraction of the values (default: 0.001)')
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        This function builds the processing options selected on the command
+        line. The incremental mode takes precedence over the approximate
+        one, and both over the streaming one
+
+        Args:
+            args (argparse.Namespace): The parsed options of 'add_arguments'
+
+        Returns:
+            ProcessingOptions: The selected options
+        """
+        if args.incremental:
+            mode = 'incremental'
+        elif args.approximate:
+            mode = 'approximate'
+        else:
+            mode = 'stream' if args.stream else 'memory'
+        return cls(mode=mode, workers=args.workers, chunk_size=args.chunk_size,
+                   spill_threshold=args.spill_threshold,
+                   error_bounds=(args.quantile_error, args.mode_error))
+
+
+class ReportOptions:
+    """
+    Class to hold what ComputeStatistics reports: the metrics and the
+    backend computing them in memory, the histogram bins, and the JSON
+    copy of the results
+    """
+
+    def __init__(self, metrics=None, backend='python', histogram_bins=HISTOGRAM_BINS,
+                 histogram_range=None, json_path=None):
+        """
+        Initializes the ReportOptions object
+
+        Args:
+            metrics (iterable): Names of the metrics to compute, out of the
+            keys of METRIC_LABELS. Computes the mean, median, mode, variance
+            and standard deviation by default
+            backend (str): 'python' for the pure-Python statistics or
+            'numpy' for the vectorized ones. Falls back to 'python' when
+            NumPy is not installed
+            histogram_bins (int): Number of bins of the histogram
+            histogram_range (tuple): Optional (low, high) bounds of the
+            histogram. Defaults to the smallest and largest values
+            json_path (str): Path of a JSON copy of the results, or None to
+            only write the results file
+
+        Returns:
+            None
+        """
+        self.metrics = DEFAULT_METRICS if metrics is None else tuple(metrics)
+        self.backend = backend
+        self.histogram_bins = histogram_bins
+        self.histogram_range = histogram_range
+        self.json_path = json_path
+
+    @property
+    def needs_order(self):
+        """
+        This function tells whether a requested metric depends on the order
+        of the values, like the median, mode, percentiles and histogram
+
+        Returns:
+            bool: True if an order metric is requested
+        """
+        return not ORDER_METRICS.isdisjoint(self.metrics)
+
+    @property
+    def with_power_sums(self):
+        """
+        This function tells whether a requested metric comes from the power
+        sums of the values
+
+        Returns:
+            bool: True if a power sum metric is requested
+        """
+        return not POWER_SUM_METRICS.isdisjoint(self.metrics)
+
+    @property
+    def use_numpy(self):
+        """
+        This function tells whether the in-memory statistics are computed
+        with the NumPy backend, which needs NumPy to be installed
+
+        Returns:
+            bool: True if the NumPy backend is used
+        """
+        return self.backend == 'numpy' and numpy_backend.is_available()
+
+    def histogram_bounds(self, power_sums):
+        """
+        This function returns the bounds of the histogram: the configured
+        range, or the smallest and largest values
+
+        Args:
+            power_sums (PowerSums): The power sums of the whole input
+
+        Returns:
+            tuple: The (low, high) bounds
+        """
+        return self.histogram_range or (power_sums.minimum, power_sums.maximum)
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """
+        This function adds the report options to a command line parser
+
+        Args:
+            parser (argparse.ArgumentParser): The parser of the program
+
+        Returns:
+            None
+        """
+        parser.add_argument('--backend', choices=('python', 'numpy'), default='python',
+                            help='statistics backend, numpy falls back to python '
+                                 'when NumPy is not installed')
+        parser.add_argument('--metrics', type=parse_metrics, default='default',
+                            help='comma-separated metrics to compute out of '
+                                 f'{", ".join(METRIC_LABELS)}, or all of them with "all" '
+                                 f'(default: {",".join(DEFAULT_METRICS)})')
+        parser.add_argument('--histogram-bins', type=int, default=HISTOGRAM_BINS, metavar='N',
+                            help=f'bins of the histogram metric (default: {HISTOGRAM_BINS})')
+        parser.add_argument('--histogram-range', type=parse_range, default=None,
+                            metavar='LOW,HIGH',
+                            help='bounds of the histogram bins, values outside them are '
+                                 'left out (default: smallest and largest value)')
+        parser.add_argument('--json', default=None, metavar='FILE',
+                            help='also write the results to FILE as JSON')
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        This function builds the report options selected on the command line
+
+        Args:
+            args (argparse.Namespace): The parsed options of 'add_arguments'
+
+        Returns:
+            ReportOptions: The selected options
+        """
+        return cls(metrics=args.metrics, backend=args.backend,
+                   histogram_bins=args.histogram_bins,
+                   histogram_range=args.histogram_range, json_path=args.json)
 
 
 class ComputeStatistics:
@@ -17,15 +274,35 @@ class ComputeStatistics:
     Class to compute statistics from a TXT input file
     """
 
-    def __init__(self, file):
+    def __init__(self, file, options=None, report=None, output=None, instrumentation=None):
         """
         Initializes the ComputeStatistics object
 
+        Args:
+            file (str): Path of the TXT input file
+            options (ProcessingOptions): The processing mode and its
+            settings. Reads every value into memory by default
+            report (ReportOptions): The metrics and how they are reported.
+            Computes the default metrics with the pure-Python backend
+            output (OutputOptions): Results file, console echo and rejected
+            lines. Defaults to 'StatisticsResults.txt' with every result
+            echoed
+            instrumentation (Instrumentation): Stage timings and counters of
+            the run. Disabled by default
+
         Returns:
             None
         """
         self.file_path = file
+        self.options = options if options is not None else ProcessingOptions()
+        self.report = report if report is not None else ReportOptions()
+        self.output = output if output is not None else OutputOptions('StatisticsResults.txt')
+        self.instrumentation = instrumentation if instrumentation is not None \
+            else Instrumentation()
         self.total_lines = None
+        self.rejects = RejectLog(self.output.rejected_samples)
+        if self.report.backend == 'numpy' and not self.report.use_numpy:
+            print('NumPy is not installed, using the pure-Python backend')
 
     def process_txt_file(self):
         """
@@ -35,12 +312,35 @@ class ComputeStatistics:
         Returns:
             None
         """
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
+        with self.instrumentation.session('compute_statistics', self.file_path):
+            if self.options.mode == 'incremental':
+                self.process_txt_incremental()
+            elif self.options.workers > 1:
+                self.process_txt_parallel()
+            elif self.options.mode == 'approximate':
+                self.process_txt_sketched()
+            elif self.options.mode == 'stream':
+                self.process_txt_stream()
+            else:
+                self.process_txt_serial()
+
+    def process_txt_serial(self):
+        """
+        Reads every value of the text file into memory and computes its
+        statistics
 
-                self.total_lines = self.lines_counter(lines)
-                num_list = self.store_nums(lines)
+        Returns:
+            None
+        """
+        instrumentation = self.instrumentation
+        try:
+            with LineScanner(self.file_path) as scanner:
+                with instrumentation.span('count'):
+                    self.total_lines = scanner.count_lines()
+                with instrumentation.span('parse'):
+                    num_list = self.store_nums(scanner.iter_lines(), self.rejects)
+                    self.rejects.report()
+                instrumentation.count_parsed(scanner.size, self.total_lines, len(num_list))
 
                 if num_list:
                     self.compute_statistics(num_list)
@@ -48,28 +348,276 @@ class ComputeStatistics:
         except FileNotFoundError:
             print(f'File not found: {self.file_path}')
 
-    @staticmethod
-    def store_nums(lines):
+    def process_txt_stream(self):
+        """
+        Reads the text file in chunks and computes its statistics in a
+        single pass without keeping the values in memory. The mean, variance
+        and standard deviation come from running moments, while the median
+        and mode come from sorted runs spilled to disk
+
+        Returns:
+            None
+        """
+        start_time = time.time()
+        options = self.options
+        moments = RunningMoments()
+        power_sums = PowerSums()
+        needs_order = self.report.needs_order
+
+        try:
+            with LineScanner(self.file_path, options.chunk_size, release_pages=True) as scanner, \
+                    SpillingSorter(options.spill_threshold) as spilled_nums:
+                with self.instrumentation.span('parse'):
+                    for num_batch in FLOAT_PARSER.batches(scanner.iter_lines(), self.rejects):
+                        for num_in_line in num_batch:
+                            moments.push(num_in_line)
+                            if self.report.with_power_sums:
+                                power_sums.push(num_in_line)
+                            if needs_order:
+                                spilled_nums.push(num_in_line)
+                    self.rejects.report()
+                # Every line is either a value or a rejected line
+                self.total_lines = moments.count + self.rejects.total
+                self.instrumentation.count_parsed(scanner.size, self.total_lines, moments.count)
+
+                if moments.count:
+                    self.report_selected_metrics({
+                        'mean': lambda: self.integral(moments.mean),
+                        'median': spilled_nums.median,
+                        'mode': spilled_nums.mode,
+                        'variance': moments.variance,
+                        'stddev': moments.stddev,
+                        **power_sums.metrics(),
+                        **{name: partial(spilled_nums.percentile, percent)
+                           for name, percent in PERCENTILES.items()},
+                        'histogram': lambda: histogram(spilled_nums.iter_runs(),
+                                                       self.report.histogram_bins,
+                                                       *self.report.histogram_bounds(power_sums)),
+                    }, self.total_lines - moments.count, start_time)
+
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+
+    def process_txt_parallel(self):
         """
-        Extracts and stores numerical values from the given list of lines
+        Splits the text file into byte ranges aligned on line boundaries,
+        parses them in a process pool and merges the partial aggregates
+        returned by each worker. The median and mode come from the merged
+        frequency table, the variance from the merged moments
+
+        Returns:
+            None
+        """
+        start_time = time.time()
+
+        try:
+            byte_ranges = split_byte_ranges(self.file_path, self.options.workers * 4)
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+            return
+
+        totals = PartialStatistics(*self.options.sketch_errors)
+        with self.instrumentation.span('parse'), \
+                ProcessPoolExecutor(max_workers=self.options.workers) as executor:
+            futures = [executor.submit(parse_byte_range, self.file_path, byte_range,
+                                       self.report, self.options.sketch_errors,
+                                       self.rejects.samples)
+                       for byte_range in byte_ranges]
+            for future in futures:
+                totals.merge(future.result())
+        self.instrumentation.count_parsed(sum(end - start for start, end in byte_ranges),
+                                          totals.lines, totals.moments.count)
+
+        self.report_partial_statistics(totals, start_time)
+
+    def process_txt_incremental(self):
+        """
+        Resumes from the snapshot saved next to the text file, folds in the
+        lines appended since it was taken and saves a new snapshot. The
+        input is read from the start when there is no valid snapshot. A last
+        line without a line ending is reported but left out of the snapshot,
+        since it may still be growing. The snapshot only holds bounded
+        aggregates: the moments, and the sketches the median, mode,
+        percentiles and histogram come from when one of them is requested
+
+        Returns:
+            None
+        """
+        start_time = time.time()
+        options = self.options
+        needs_order = self.report.needs_order
+        sketch_errors = options.error_bounds if needs_order else (None, None)
+
+        instrumentation = self.instrumentation
+        try:
+            with instrumentation.span('snapshot'):
+                snapshot = load_snapshot(self.file_path)
+            if snapshot and needs_order and snapshot[1].quantiles is None:
+                print('Snapshot was taken without sketches, recomputing from the start')
+                snapshot = None
+            if snapshot and self.report.with_power_sums and \
+                    snapshot[1].power_sums.count != snapshot[1].moments.count:
+                print('Snapshot was taken without power sums, recomputing from the start')
+                snapshot = None
+            offset, totals = snapshot if snapshot else (0, PartialStatistics(*sketch_errors))
+            resumed_lines, resumed_values = totals.lines, totals.moments.count
+
+            with LineScanner(self.file_path, release_pages=True) as scanner:
+                last_newline = scanner.size
+                if scanner.size > offset:
+                    last_newline = scanner.find_last_newline(offset) + 1
+                with instrumentation.span('parse'):
+                    self.fold_lines(totals, scanner.iter_lines(offset, last_newline))
+                with instrumentation.span('snapshot'):
+                    save_snapshot(self.file_path, last_newline, totals)
+                with instrumentation.span('parse'):
+                    self.fold_lines(totals, scanner.iter_lines(last_newline))
+                    self.rejects.report()
+                instrumentation.count_parsed(max(scanner.size - offset, 0),
+                                             totals.lines - resumed_lines,
+                                             totals.moments.count - resumed_values)
+
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+            return
+
+        self.report_partial_statistics(totals, start_time)
+
+    def process_txt_sketched(self):
+        """
+        Reads the text file in batches and computes its statistics with
+        bounded memory. The median and mode come from mergeable sketches
+        whose error bound is reported with the results
+
+        Returns:
+            None
+        """
+        start_time = time.time()
+        totals = PartialStatistics(*self.options.sketch_errors)
+
+        try:
+            with LineScanner(self.file_path, self.options.chunk_size,
+                             release_pages=True) as scanner, self.instrumentation.span('parse'):
+                self.fold_lines(totals, scanner.iter_lines())
+                self.rejects.report()
+            self.instrumentation.count_parsed(scanner.size, totals.lines, totals.moments.count)
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+            return
+
+        self.report_partial_statistics(totals, start_time)
+
+    def fold_lines(self, totals, lines, batch_size=BATCH_LINES):
+        """
+        This function parses lines in batches and folds them into the
+        running aggregates. The values are only counted by the sketches of
+        the aggregates, never by an exact frequency table
 
         Args:
-            lines (list): List of lines from the TXT input file
+            totals (PartialStatistics): The aggregates to be updated
+            lines (iterable): Lines from the TXT input file
+            batch_size (int): Number of lines parsed at once
 
         Returns:
-            list: List of numerical values
+            None
         """
-        num_list = []
-        for line in lines:
-            stripped_line = line.strip()
-            if stripped_line:
-                try:
-                    num_in_line = float(stripped_line)
-                    num_list.append(num_in_line)
-                except ValueError:
-                    print(f'Skipping invalid value: {stripped_line}')
-            else:
-                print(f'Skipping empty line: {stripped_line}')
+        lines = iter(lines)
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch:
+                return
+            totals.add_values(self.store_nums(batch, self.rejects), len(batch),
+                              with_frequencies=False,
+                              with_power_sums=self.report.with_power_sums)
+
+    def report_partial_statistics(self, totals, start_time):
+        """
+        This function reports the requested metrics out of merged aggregates.
+        The median and mode come from the frequency table, or from the
+        sketches in approximate mode, and the variance from the merged moments
+
+        Args:
+            totals (PartialStatistics): The aggregates of the whole input
+            start_time (float): Time at which the computation started
+
+        Returns:
+            None
+        """
+        self.total_lines = totals.lines
+        if not totals.moments.count:
+            return
+
+        metric_values = {
+            'mean': lambda: self.integral(totals.total / totals.moments.count),
+            'median': totals.frequencies.median,
+            'mode': lambda: format_mode(totals.frequencies),
+            'variance': totals.moments.variance,
+            'stddev': totals.moments.stddev,
+            **totals.power_sums.metrics(),
+            **{name: partial(totals.frequencies.percentile, percent)
+               for name, percent in PERCENTILES.items()},
+            'histogram': lambda: totals.frequencies.histogram(
+                self.report.histogram_bins, self.report.histogram_bounds(totals.power_sums)),
+        }
+        error_bound = {}
+        if totals.quantiles is not None:
+            metric_values['median'] = lambda: totals.quantiles.quantile(0.5)
+            metric_values['mode'] = lambda: format_mode(totals.heavy_hitters)
+            metric_values.update({name: partial(totals.quantiles.quantile, percent / 100)
+                                  for name, percent in PERCENTILES.items()})
+            metric_values['histogram'] = lambda: histogram(
+                totals.quantiles.weighted_items(), self.report.histogram_bins,
+                *self.report.histogram_bounds(totals.power_sums))
+            error_bound['Error Bound'] = (
+                f'median within {totals.quantiles.rank_error():.2%} of rank, '
+                f'mode counts within +{totals.heavy_hitters.count_error()}')
+        self.report_selected_metrics(metric_values, totals.rejected, start_time, error_bound)
+
+    def report_selected_metrics(self, metric_values, removed_elements, start_time,
+                                notes=None):
+        """
+        This function computes the requested metrics out of the available
+        ones and reports them
+
+        Args:
+            metric_values (dict): Functions returning each metric, keyed by
+            the metric name
+            removed_elements (int): Number of lines that were not numbers
+            start_time (float): Time at which the computation started
+            notes (dict): Extra lines reported after the metrics, keyed by
+            their label
+
+        Returns:
+            None
+        """
+        with self.instrumentation.span('compute'):
+            statistics = {METRIC_LABELS[name]: metric_values[name]()
+                          for name in self.report.metrics}
+        statistics.update(notes or {})
+        with self.instrumentation.span('write'):
+            self.report_statistics(removed_elements, statistics, time.time() - start_time)
+
+    @classmethod
+    def store_nums(cls, lines, rejects=None):
+        """
+        Extracts and stores numerical values from the given lines
+
+        Args:
+            lines (iterable): Lines from the TXT input file, as str or bytes.
+            Lines read as bytes are only decoded when they are not a plain
+            ASCII number
+            rejects (RejectLog): Where the rejected lines are counted. When
+            None, the rejected lines are reported once the lines are parsed
+
+        Returns:
+            array: Numerical values packed as doubles
+        """
+        reject_log = RejectLog() if rejects is None else rejects
+        num_list = array('d')
+        for num_batch in FLOAT_PARSER.batches(lines, reject_log):
+            num_list.fromlist(num_batch)
+        if rejects is None:
+            reject_log.report()
         return num_list
 
     @staticmethod
@@ -124,65 +672,19 @@ class ComputeStatistics:
         return result
 
     @staticmethod
-    def setting(iterable):
-        """
-        This function creates a set from the given iterable object
-
-        Args:
-            iterable (iterable): An iterable object
-
-        Returns:
-            set: The set of the unique elements from the iterable
-        """
-        elements = []
-        for element in iterable:
-            if element not in elements:
-                elements.append(element)
-        return elements
-
-    @staticmethod
-    def mapping(func, iterable):
+    def integral(value):
         """
-        This function applies the given function to each element
-        of a given iterable object
+        This function returns a number as an integer when it has no
+        fractional part
 
         Args:
-            func: The function to apply to the elements
-            iterable (iterable): An iterable object
+            value (float): The number to be simplified
 
         Returns:
-            A list containing the results of applying the function to each
-            element
-        """
-        return [func(element) for element in iterable]
-
-    def sorter(self, iterable, key=None, reverse=False):
+            int|float: The number as an integer if it is integral, otherwise
+            the number unchanged
         """
-        This function returns a sorted list from the elements
-        of the given iterable object
-
-        Args:
-            iterable (iterable): An iterable object
-            key: A function to extract a comparison key from each
-            element. Default is None
-            reverse (bool): Indicates whether to sort in descending
-            order. Default is False
-
-        Returns:
-            A sorted list containing the sorted elements from the iterable
-        """
-        elements = list(iterable)
-
-        n = self.counter(elements)
-        for i in range(n):
-            for j in range(0, n - i - 1):
-                compare_value_j = elements[j] if key is None else key(elements[j])
-                compare_value_j_plus_1 = elements[j + 1] if key is None else key(elements[j + 1])
-
-                if (reverse and compare_value_j < compare_value_j_plus_1) or \
-                        (not reverse and compare_value_j > compare_value_j_plus_1):
-                    elements[j], elements[j + 1] = elements[j + 1], elements[j]
-        return elements
+        return integral(value)
 
     def calculate_mean(self, num_list):
         """
@@ -195,47 +697,7 @@ class ComputeStatistics:
             int|float: The mean of the numbers
         """
         mean_val = self.adder(num_list) / self.counter(num_list)
-        return int(mean_val) if mean_val == int(mean_val) else mean_val
-
-    def calculate_median(self, num_list):
-        """
-        This function takes a list of numbers and calculates their median
-
-        Args:
-            num_list (list): A list of numbers
-
-        Returns:
-            int|float: The median of the numbers
-        """
-        sorted_list = self.sorter(num_list)
-        n = self.counter(sorted_list)
-        mid_index_1 = n // 2
-        mid_index_2 = (n - 1) // 2
-        even_num_median = (sorted_list[mid_index_1] + sorted_list[mid_index_2]) / 2
-        return even_num_median if n % 2 == 0 else sorted_list[mid_index_1]
-
-    def calculate_mode(self, num_list):
-        """
-        This function takes a list of numbers and calculates their mode
-
-        Args:
-            num_list (list): A list of numbers
-
-        Returns:
-            int|float|str|None:
-            If there is only one number with the highest mode, returns that number as
-            integer or float,
-            If there are multiple numbers with the highest mode, returns them as a string
-            separated by commas
-            If all numbers have the same mode, returns None
-        """
-        sorted_nums = self.sorter(num_list)
-        max_freq = max(sorted_nums.count(num) for num in self.setting(sorted_nums))
-        mode_nums = [num for num in self.setting(sorted_nums) if sorted_nums.count(num) == max_freq]
-        if self.counter(self.setting(sorted_nums.count(num) for num in sorted_nums)) == 1:
-            return 'N/A'
-        return mode_nums[0] if self.counter(mode_nums) == 1 else ', '.join(self.mapping(str,
-                                                                                        mode_nums))
+        return self.integral(mean_val)
 
     def calculate_variance(self, num_list):
         """
@@ -276,43 +738,143 @@ class ComputeStatistics:
         """
         start_time = time.time()
 
-        output_initial_count = self.total_lines
-        output_cleaned_count = self.counter(num_list)
-        removed_elements = output_initial_count - output_cleaned_count
-        output_mean = self.calculate_mean(num_list)
-        output_median = self.calculate_median(num_list)
-        output_mode = self.calculate_mode(num_list)
-        output_variance = self.calculate_variance(num_list)
-        output_stddev = self.calculate_stddev(num_list)
+        state_class = numpy_backend.NumpyStatistics if self.report.use_numpy else StatisticsState
+        state = state_class(num_list, histogram_bins=self.report.histogram_bins,
+                            histogram_range=self.report.histogram_range)
+        statistics = state.compute(self.report.metrics, self.instrumentation)
 
         end_time = time.time()
 
-        print('\nDescriptive Statistics Results:')
-        print(f'\nTotal Initial Count: {output_initial_count}')
-        print(f'\nRemoved a total of: {removed_elements} elements')
-        print(f'\nMean: {output_mean}')
-        print(f'\nMedian: {output_median}')
-        print(f'\nMode: {output_mode}')
-        print(f'\nVariance: {output_variance}')
-        print(f'\nStandard Deviation: {output_stddev}\n')
-        print(f'\nElapsed Time: {end_time - start_time} s')
-
-        with open('StatisticsResults.txt', 'w', encoding='utf-8') as file:
-            file.write('Descriptive Statistics Results:')
-            file.write(f'\nTotal Initial Count: {output_initial_count}')
-            file.write(f'\nRemoved a total of: {removed_elements} elements')
-            file.write(f'\nMean: {output_mean}')
-            file.write(f'\nMedian: {output_median}')
-            file.write(f'\nMode: {output_mode}')
-            file.write(f'\nVariance: {output_variance}')
-            file.write(f'\nStandard Deviation: {output_stddev}\n')
-            file.write(f'\nElapsed Time: {end_time - start_time} s')
+        with self.instrumentation.span('write'):
+            self.report_statistics(self.total_lines - state.count, statistics,
+                                   end_time - start_time)
+
+    def report_statistics(self, removed_elements, statistics, elapsed_time):
+        """
+        This function prints the statistics and writes them into the
+        results file, 'StatisticsResults.txt' by default, and into the
+        JSON file when one was requested
+
+        Args:
+            removed_elements (int): Number of lines that were not numbers
+            statistics (dict): The statistics to report, keyed by their label
+            elapsed_time (float): Time spent computing the statistics, in seconds
+
+        Returns:
+            None
+        """
+        results = [f'Total Initial Count: {self.total_lines}',
+                   f'Removed a total of: {removed_elements} elements']
+        results += [f'{label}: {format_statistic(value)}' for label, value in statistics.items()]
+
+        file_text = ('Descriptive Statistics Results:'
+                     + ''.join(f'\n{result}' for result in results[:-1])
+                     + f'\n{results[-1]}\n'
+                     + f'\nElapsed Time: {elapsed_time} s')
+        console_text = ('\nDescriptive Statistics Results:\n'
+                        + ''.join(f'\n{result}\n' for result in results[:-1])
+                        + f'\n{results[-1]}\n\n'
+                        + f'\nElapsed Time: {elapsed_time} s\n')
+
+        with self.output.open_writer() as writer:
+            writer.write_summary(file_text, console_text)
+        if self.report.json_path is not None:
+            self.write_json(removed_elements, statistics, elapsed_time)
+
+    def write_json(self, removed_elements, statistics, elapsed_time):
+        """
+        This function writes the results as a JSON document, with every
+        statistic keyed by its metric name and the histogram as a list of
+        bins
+
+        Args:
+            removed_elements (int): Number of lines that were not numbers
+            statistics (dict): The statistics to report, keyed by their label
+            elapsed_time (float): Time spent computing the statistics, in seconds
+
+        Returns:
+            None
+        """
+        metric_names = {label: name for name, label in METRIC_LABELS.items()}
+        values = {}
+        for label, value in statistics.items():
+            if isinstance(value, list):
+                value = [{'low': low, 'high': high, 'count': count}
+                         for low, high, count in value]
+            values[metric_names.get(label, label.lower().replace(' ', '_'))] = value
+        document = {
+            'input': self.file_path,
+            'total_initial_count': self.total_lines,
+            'removed': removed_elements,
+            'statistics': values,
+            'elapsed_time': elapsed_time,
+        }
+        with open(self.report.json_path, 'w', encoding='utf-8') as file:
+            json.dump(document, file, indent=2)
+            file.write('\n')
+
+
+def parse_byte_range(file_path, byte_range, report, sketch_errors=(None, None),
+                     rejected_samples=SAMPLE_LINES):
+    """
+    Parses the lines of a byte range of a TXT input file into mergeable
+    partial aggregates. Runs inside the worker processes of the parallel mode
+
+    Args:
+        file_path (str): Path of the TXT input file
+        byte_range (tuple): Offsets of the first byte of the range and just
+        past its last byte
+        report (ReportOptions): The requested metrics, which select the
+        frequency table and power sums the range needs
+        sketch_errors (tuple): Accepted quantile and mode errors of the
+        sketches used in approximate mode, or (None, None) for exact ones
+        rejected_samples (int): Number of rejected lines of the range printed
+        before they are only counted, or None to print all of them
+
+    Returns:
+        PartialStatistics: The aggregates of the range
+    """
+    rejects = RejectLog(rejected_samples)
+    with LineScanner(file_path) as scanner:
+        num_list = ComputeStatistics.store_nums(scanner.iter_lines(*byte_range), rejects)
+        rejects.report()
+        total_lines = scanner.count_lines(*byte_range)
+    partial_statistics = PartialStatistics(*sketch_errors)
+    return partial_statistics.add_values(num_list, total_lines, report.needs_order,
+                                         report.with_power_sums)
+
+
+def main():
+    """
+    Parses the command line arguments and runs the program
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        prog='python3 compute_statistics.py',
+        description='Computes descriptive statistics from a TXT input file')
+    parser.add_argument('file_path', help='TXT input file with one number per line')
+    ProcessingOptions.add_arguments(parser)
+    ReportOptions.add_arguments(parser)
+    OutputOptions.add_arguments(parser)
+    Instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.histogram_bins < 1:
+        parser.error('--histogram-bins must be at least 1')
+    if not 0 < args.quantile_error < 1:
+        parser.error('--quantile-error must be between 0 and 1')
+    if not 0 < args.mode_error < 1:
+        parser.error('--mode-error must be between 0 and 1')
+
+    data_processor = ComputeStatistics(args.file_path,
+                                       options=ProcessingOptions.from_args(args),
+                                       report=ReportOptions.from_args(args),
+                                       output=OutputOptions.from_args(args,
+                                                                      'StatisticsResults.txt'),
+                                       instrumentation=Instrumentation.from_args(args))
+    data_processor.process_txt_file()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print('Usage: python3 compute_statistics.py <file_path>')
-    else:
-        file_path = sys.argv[1]
-        data_processor = ComputeStatistics(file_path)
-        data_processor.process_txt_file()
+    main()
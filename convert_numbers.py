@@ -8,104 +8,128 @@ TXT output file
 Author:
     Julia Gabriela Pinedo (A01795315)
 """
+import argparse
+import os
 import sys
 import time
-
-
-class ConvertNumbers:
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain, islice
+
+from instrumentation import Instrumentation
+from numeric_parser import BATCH_LINES, INT_PARSER, RejectLog
+from numeric_storage import IntBuffer
+from result_writer import OutputOptions
+from text_input import LineScanner
+from word_encoding import WordEncoder, base_label, format_in_base
+
+MIN_NEGATIVE_BITS = 10
+NEGATIVE_HEX_BITS = 40
+BYTE_TO_HEX = {format(byte, '08b'): format(byte, '02X') for byte in range(256)}
+WORKER_STATE = {}
+
+
+class ConversionOptions:
     """
-    Class to convert numbers from a TXT input file
+    Class to hold how ConvertNumbers converts its input: the word width and
+    base of the output, the size of the conversion cache and the streaming
+    and parallel modes
     """
 
-    def __init__(self, file):
+    def __init__(self, width=None, base=16, cache_size=4096, workers=1, streaming=False):
         """
-        Initializes the ConvertNumbers object
+        Initializes the ConversionOptions object
 
-        Returns:
-            None
-        """
-        self.file_path = file
-        self.total_lines = None
-
-    def process_txt_file(self):
-        """
-        Reads the text file, processes the data, and inputs it into the
-        'convert_numbers' function
+        Args:
+            width (int): Bits of the two's complement word every number is
+            written with. None keeps the original variable-width output
+            base (int): Base of the second representation, from 2 to 36
+            cache_size (int): Number of recent conversions kept in the LRU
+            cache. 0 disables the cache
+            workers (int): Number of processes converting the numbers. More
+            than one splits the numbers into blocks converted in parallel
+            streaming (bool): Whether to convert and write every number as
+            it is read instead of reading the whole file first. Reading
+            from the standard input ('-') always streams
 
         Returns:
             None
         """
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-
-                self.total_lines = self.lines_counter(lines)
-                num_list = self.store_nums(lines)
-
-                if num_list:
-                    self.convert_numbers(num_list)
-
-        except FileNotFoundError:
-            print(f'File not found: {self.file_path}')
-
-    @staticmethod
-    def store_nums(lines):
+        self.width = width
+        self.base = base
+        self.cache_size = cache_size
+        self.workers = workers
+        self.streaming = streaming
+
+    @classmethod
+    def add_arguments(cls, parser):
         """
-        Extracts and stores numerical values from the given list of lines
+        This function adds the conversion options to a command line parser
 
         Args:
-            lines (list): List of lines from the TXT input file
+            parser (argparse.ArgumentParser): The parser of the program
 
         Returns:
-            list: List of numerical values
+            None
         """
-        num_list = []
-        for line in lines:
-            stripped_line = line.strip()
-            if stripped_line:
-                try:
-                    num_in_line = int(stripped_line)
-                    num_list.append(num_in_line)
-                except ValueError:
-                    print(f'Skipping invalid value: {stripped_line}')
-            else:
-                print(f'Skipping empty line: {stripped_line}')
-        return num_list
-
-    @staticmethod
-    def lines_counter(lines):
+        parser.add_argument('--cache-size', type=int, default=4096,
+                            help='recent conversions kept in the LRU cache, 0 disables it '
+                                 '(default: 4096)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='processes converting the numbers in parallel (default: 1)')
+        parser.add_argument('--width', type=int, default=None,
+                            help='bits of the two\'s complement word, e.g. 8, 16, 32 or 64; '
+                                 'numbers that do not fit are skipped (default: variable width)')
+        parser.add_argument('--base', type=int, choices=range(2, 37), default=16,
+                            metavar='{2..36}',
+                            help='base of the second representation, e.g. 8 for octal '
+                                 '(default: 16)')
+        parser.add_argument('--stream', action='store_true',
+                            help='convert and write every number as it is read, with '
+                                 'constant memory')
+
+    @classmethod
+    def from_args(cls, args):
         """
-        This function counts the total number of lines in a TXT file
-        before cleaning any non-valid values
+        This function builds the conversion options selected on the command
+        line
 
         Args:
-            lines (list): List of lines from the TXT input file
+            args (argparse.Namespace): The parsed options of 'add_arguments'
 
         Returns:
-            int: Total number of lines in the list before cleaning
+            ConversionOptions: The selected options
         """
-        total_count = 0
+        return cls(width=args.width, base=args.base, cache_size=args.cache_size,
+                   workers=args.workers, streaming=args.stream)
 
-        for _ in lines:
-            total_count += 1
-        return total_count
 
-    @staticmethod
-    def counter(counted_elements):
+class NumberConverter:
+    """
+    Class to convert decimal numbers into binary and into hexadecimal or
+    another base, caching the most recent conversions
+    """
+
+    def __init__(self, width=None, base=16, cache_size=4096):
         """
-        This function counts the total number of elements in an
-        iterable object
+        Initializes the NumberConverter object
 
         Args:
-            counted_elements (iterable): An iterable object
+            width (int): Bits of the two's complement word every number is
+            written with. None keeps the original variable-width output
+            base (int): Base of the second representation, from 2 to 36
+            cache_size (int): Number of recent conversions kept in the LRU
+            cache. 0 disables the cache
 
         Returns:
-            int: Total number of elements in the list or set
+            None
         """
-        count = 0
-        for _ in counted_elements:
-            count += 1
-        return count
+        self.base = base
+        self.encoder = WordEncoder(width, base) if width is not None else None
+        self.base_label = base_label(base)
+        self.convert_number = lru_cache(maxsize=cache_size)(self.convert_number_uncached)
 
     @staticmethod
     def abs_value(num_element):
@@ -124,7 +148,8 @@ class ConvertNumbers:
     @staticmethod
     def invert_bits_of_binary_number(bin_input):
         """
-        This function is used to invert the bits of a given binary number
+        This function is used to invert the bits of a given binary number,
+        after prefixing it with a 0 sign bit
 
         Args:
             bin_input (str): The binary number
@@ -132,15 +157,16 @@ class ConvertNumbers:
         Returns:
             str: The inverted binary number
         """
-        inverted_bin = ''
-        for bit in '0' + bin_input:
-            inverted_bin += '0' if bit == '1' else '1'
-        return inverted_bin
+        width = len(bin_input) + 1
+        value = int(bin_input, 2) if bin_input else 0
+        return format(~value & ((1 << width) - 1), f'0{width}b')
 
-    def binary_addition(self, inverted_bin):
+    @staticmethod
+    def binary_addition(inverted_bin):
         """
         This function is used to increment 1 to the LSB of the given inverted
-        binary number
+        binary number, dropping the final carry and sign-extending the result
+        to at least 10 bits
 
         Args:
             inverted_bin (str): The binary number
@@ -148,22 +174,16 @@ class ConvertNumbers:
         Returns:
             str: The result of the addition
         """
-        max_len = self.counter(inverted_bin)
-        carry = 1
-        bin_add = ''
-
-        for i in range(max_len - 1, -1, -1):
-            bit_sum = carry + int(inverted_bin[i])
-            bin_add = str(bit_sum % 2) + bin_add
-            carry = bit_sum // 2
-
-        while self.counter(bin_add) < 10:
-            bin_add = '1' + bin_add
-        return bin_add
+        width = len(inverted_bin)
+        value = int(inverted_bin, 2) + 1 if inverted_bin else 0
+        bin_add = format(value & ((1 << width) - 1), f'0{width}b') if width else ''
+        return bin_add.rjust(MIN_NEGATIVE_BITS, '1')
 
-    def twos_complement_of_binary_number(self, bin_input):
+    @staticmethod
+    def twos_complement_of_binary_number(bin_input):
         """
-        This function obtains the 2's complement of a binary number
+        This function obtains the 2's complement of a binary number, one bit
+        wider than the number and sign-extended to at least 10 bits
 
         Args:
             bin_input (str): The binary number
@@ -171,9 +191,9 @@ class ConvertNumbers:
         Returns:
             str: The 2's complement of the given binary number
         """
-        inverted_binary = self.invert_bits_of_binary_number(bin_input)
-        incremented_binary = self.binary_addition(inverted_binary)
-        return incremented_binary
+        width = len(bin_input) + 1
+        value = int(bin_input, 2) if bin_input else 0
+        return format(-value & ((1 << width) - 1), f'0{width}b').rjust(MIN_NEGATIVE_BITS, '1')
 
     def dec_to_bin_converter(self, input_num):
         """
@@ -186,24 +206,22 @@ class ConvertNumbers:
             str: The binary representation of the decimal number
         """
         if input_num < 0:
-            invert_binary = True
-            input_num = self.abs_value(input_num)
-        else:
-            invert_binary = False
-
-        bin_num = ''
-        while True:
-            if input_num == 0:
-                break
-            if (input_num % 2) == 0:
-                input_num = input_num // 2
-                bin_num = '0' + bin_num
-            else:
-                input_num = input_num // 2
-                bin_num = '1' + bin_num
-        if invert_binary:
-            bin_num = self.twos_complement_of_binary_number(bin_num)
-        return bin_num
+            return self.twos_complement_of_binary_number(format(self.abs_value(input_num), 'b'))
+        return format(input_num, 'b') if input_num else ''
+
+    @staticmethod
+    def bytes_to_hex(padded_bin):
+        """
+        This function converts a binary string whose length is a multiple
+        of 8 into hexadecimal, one byte at a time through a lookup table
+
+        Args:
+            padded_bin (str): The binary string
+
+        Returns:
+            str: The hexadecimal representation, two digits per byte
+        """
+        return ''.join([BYTE_TO_HEX[padded_bin[i:i + 8]] for i in range(0, len(padded_bin), 8)])
 
     def positive_bin_to_hex_converter(self, binary_str):
         """
@@ -216,36 +234,14 @@ class ConvertNumbers:
         Returns:
             str: The hexadecimal representation of the binary string
         """
-        bin_transformed = binary_str.zfill((self.counter(binary_str) + 3) // 4 * 4)
-
-        hex_dict = {
-            '0000': '0',
-            '0001': '1',
-            '0010': '2',
-            '0011': '3',
-            '0100': '4',
-            '0101': '5',
-            '0110': '6',
-            '0111': '7',
-            '1000': '8',
-            '1001': '9',
-            '1010': 'A',
-            '1011': 'B',
-            '1100': 'C',
-            '1101': 'D',
-            '1110': 'E',
-            '1111': 'F'
-        }
-
-        hex_digit = \
-            [hex_dict[bin_transformed[i:i + 4]] for i in range(0, self.counter(bin_transformed), 4)]
-        hex_num = ''.join(hex_digit)
-        return hex_num
+        hex_digits = (len(binary_str) + 3) // 4
+        padded_bin = binary_str.zfill((len(binary_str) + 7) // 8 * 8)
+        return self.bytes_to_hex(padded_bin)[-hex_digits:] if hex_digits else ''
 
     def negative_bin_to_hex_converter(self, binary_str):
         """
-        This function converts a negative binary string into
-        its hexadecimal representation
+        This function converts a negative binary string into its
+        hexadecimal representation, sign-extended to a multiple of 40 bits
 
         Args:
             binary_str (str): The negative binary representation to be converted
@@ -253,18 +249,8 @@ class ConvertNumbers:
         Returns:
             str: The hexadecimal representation of the binary string
         """
-        hex_digits = '0123456789ABCDEF'
-
-        while self.counter(binary_str) % 40 != 0:
-            binary_str = '1' + binary_str
-
-        hex_num = ''
-
-        for i in range(0, self.counter(binary_str), 4):
-            nibble = binary_str[i:i + 4]
-            dec_value = int(nibble, 2)
-            hex_num += hex_digits[dec_value]
-        return hex_num
+        width = -(-len(binary_str) // NEGATIVE_HEX_BITS) * NEGATIVE_HEX_BITS
+        return self.bytes_to_hex(binary_str.rjust(width, '1'))
 
     def dec_to_bin_to_hex_converter(self, input_num):
         """
@@ -277,60 +263,554 @@ class ConvertNumbers:
         Returns:
             str: The hexadecimal representation of the decimal number
         """
-        dec_transformed = self.dec_to_bin_converter(input_num)
+        return self.bin_to_hex_converter(self.dec_to_bin_converter(input_num), input_num)
+
+    def bin_to_hex_converter(self, binary_str, input_num):
+        """
+        This function derives the hexadecimal representation of a decimal
+        number from its already computed binary representation
 
+        Args:
+            binary_str (str): The binary representation of the number
+            input_num (int): The decimal number, used for its sign
+
+        Returns:
+            str: The hexadecimal representation of the number
+        """
         if input_num >= 0:
-            hex_num = self.positive_bin_to_hex_converter(dec_transformed)
-        else:
-            hex_num = self.negative_bin_to_hex_converter(dec_transformed)
-        return hex_num
+            return self.positive_bin_to_hex_converter(binary_str)
+        return self.negative_bin_to_hex_converter(binary_str)
+
+    def bin_to_base_converter(self, binary_str, input_num):
+        """
+        This function derives the representation of a decimal number in the
+        selected base, following the same sign extension as the hexadecimal
+        one: negative numbers are extended to a multiple of 40 bits
+
+        Args:
+            binary_str (str): The binary representation of the number
+            input_num (int): The decimal number
+
+        Returns:
+            str: The representation of the number in the selected base
+        """
+        if input_num >= 0:
+            return format_in_base(input_num, self.base)
+        width = -(-len(binary_str) // NEGATIVE_HEX_BITS) * NEGATIVE_HEX_BITS
+        mask = (1 << width) - 1
+        return format_in_base(input_num & mask, self.base, len(format_in_base(mask, self.base)))
+
+    def convert_number_uncached(self, number):
+        """
+        This function converts a decimal number into binary and derives its
+        hexadecimal representation from the binary one
+
+        Args:
+            number (int): The decimal number to be converted
+
+        Returns:
+            tuple: The binary and hexadecimal (or selected base)
+            representations
+        """
+        if self.encoder is not None:
+            return self.encoder.encode(number)
+        if number == 0:
+            return '0', '0'
+        binary_transformation = self.dec_to_bin_converter(number)
+        if self.base != 16:
+            return binary_transformation, self.bin_to_base_converter(binary_transformation, number)
+        return binary_transformation, self.bin_to_hex_converter(binary_transformation, number)
+
+    def format_record(self, number):
+        """
+        This function converts a number and formats its record as written
+        to the results file
+
+        Args:
+            number (int): The number to be converted
+
+        Returns:
+            str: The record of the number
+        """
+        binary_transformation, base_transformation = self.convert_number(number)
+        return (f'Decimal: {number}, Binary: {binary_transformation}, '
+                f'{self.base_label}: {base_transformation}\n')
+
+    def format_records(self, numbers):
+        """
+        This function converts a block of numbers and formats the record
+        of each one as written to the results file
+
+        Args:
+            numbers (iterable): The numbers to be converted
+
+        Returns:
+            list: The formatted records, in the same order as the numbers
+        """
+        return [self.format_record(number) for number in numbers]
+
+
+class ConvertNumbers:
+    """
+    Class to convert numbers from a TXT input file
+    """
+
+    def __init__(self, file, options=None, output=None, instrumentation=None):
+        """
+        Initializes the ConvertNumbers object
+
+        Args:
+            file (str): Path of the TXT input file
+            options (ConversionOptions): How the numbers are converted.
+            Defaults to the variable-width hexadecimal output of a single
+            process
+            output (OutputOptions): Results file, console echo and rejected
+            lines. Defaults to 'ConvertionResults.txt' with every result
+            echoed
+            instrumentation (Instrumentation): Stage timings and counters of
+            the run. Disabled by default
+
+        Returns:
+            None
+        """
+        self.file_path = file
+        self.options = options if options is not None else ConversionOptions()
+        self.output = output if output is not None else OutputOptions('ConvertionResults.txt')
+        self.instrumentation = instrumentation if instrumentation is not None \
+            else Instrumentation()
+        self.total_lines = None
+        self.converter = NumberConverter(self.options.width, self.options.base,
+                                         self.options.cache_size)
+        self.rejects = RejectLog(self.output.rejected_samples)
+
+    def process_txt_file(self):
+        """
+        Reads the text file, processes the data, and inputs it into the
+        'convert_numbers' function
+
+        Returns:
+            None
+        """
+        with self.instrumentation.session('convert_numbers', self.file_path):
+            if self.options.streaming or self.file_path == '-':
+                self.process_txt_stream()
+            else:
+                self.process_txt_serial()
+
+    def process_txt_serial(self):
+        """
+        Reads every number of the text file into memory and converts them
+
+        Returns:
+            None
+        """
+        instrumentation = self.instrumentation
+        try:
+            with LineScanner(self.file_path) as scanner:
+                with instrumentation.span('count'):
+                    self.total_lines = scanner.count_lines()
+                with instrumentation.span('parse'):
+                    num_list = self.store_nums(scanner.iter_lines(), self.rejects)
+                    if self.converter.encoder is not None:
+                        num_list = self.drop_out_of_range(num_list)
+                    self.rejects.report()
+                instrumentation.count_parsed(scanner.size, self.total_lines, len(num_list))
+
+                if num_list:
+                    self.convert_numbers(num_list)
+
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+
+    def process_txt_stream(self):
+        """
+        Reads the text file, or the standard input, and converts it through
+        a pipeline of generators (read, parse, convert, format, write), so
+        every number is written as soon as it is read and memory does not
+        grow with the input. The lines and bytes are counted as they go by,
+        and the summary is written once the input ends
+
+        Returns:
+            None
+        """
+        start_time = time.time()
+        instrumentation = self.instrumentation
+        consumed = [0, 0]
+
+        def counted(lines):
+            for line in lines:
+                consumed[0] += 1
+                consumed[1] += len(line)
+                yield line
+
+        def input_bytes():
+            # The lines of a file are read without their line endings
+            return consumed[1] if self.file_path == '-' else os.path.getsize(self.file_path)
+
+        try:
+            with self.open_lines() as lines:
+                # Lines are parsed at most one output batch at a time, so
+                # slow input is written as soon as a batch has arrived
+                numbers = self.parse_nums(counted(lines), self.rejects,
+                                          min(BATCH_LINES, self.output.batch_size))
+                if self.converter.encoder is not None:
+                    numbers = self.filter_in_range(numbers)
+                with instrumentation.span('parse'):
+                    first_number = next(numbers, None)
+                if first_number is None:
+                    self.rejects.report()
+                    instrumentation.count_parsed(input_bytes(), consumed[0], 0)
+                    return
+
+                numbers = chain([first_number], numbers)
+                with self.output.open_writer() as writer:
+                    if self.options.workers > 1:
+                        with instrumentation.span('convert'):
+                            worker_stats = self.convert_in_parallel(numbers, writer)
+                    else:
+                        worker_stats = {}
+                        while True:
+                            # A block fills the writer's buffer exactly, so
+                            # it is written as soon as it has been parsed
+                            with instrumentation.span('parse'):
+                                block = list(islice(numbers, self.output.batch_size))
+                            if not block:
+                                break
+                            with instrumentation.span('convert'):
+                                records = self.converter.format_records(block)
+                            with instrumentation.span('write'):
+                                writer.write_records(records)
+                    with instrumentation.span('write'):
+                        writer.flush()
+                        self.rejects.report()
+
+                        self.total_lines = consumed[0]
+                        instrumentation.count_parsed(input_bytes(), consumed[0], writer.records)
+                        self.report_summary(writer, writer.records, start_time, worker_stats)
+
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+
+    @contextmanager
+    def open_lines(self):
+        """
+        This function opens the lines of the input: the standard input when
+        the path is '-', or a LineScanner over the TXT file otherwise
+
+        Returns:
+            context manager: Yields an iterable over the lines as bytes
+        """
+        if self.file_path == '-':
+            yield sys.stdin.buffer
+            return
+        with LineScanner(self.file_path, release_pages=True) as scanner:
+            yield scanner.iter_lines()
+
+    @staticmethod
+    def parse_nums(lines, rejects=None, batch_lines=BATCH_LINES):
+        """
+        This function lazily extracts the numerical values from the given
+        lines, parsing them in batches
+
+        Args:
+            lines (iterable): Lines from the TXT input file, as str or bytes.
+            Lines read as bytes are only decoded when they are not a plain
+            ASCII number
+            rejects (RejectLog): Where the rejected lines are counted. When
+            None, the rejected lines are reported once the lines run out
+            batch_lines (int): Largest number of lines read before their
+            numbers are yielded
+
+        Returns:
+            generator: The integer in each valid line
+        """
+        reject_log = RejectLog() if rejects is None else rejects
+        for num_batch in INT_PARSER.batches(lines, reject_log, batch_lines):
+            yield from num_batch
+        if rejects is None:
+            reject_log.report()
+
+    @classmethod
+    def store_nums(cls, lines, rejects=None):
+        """
+        Extracts and stores numerical values from the given lines
+
+        Args:
+            lines (iterable): Lines from the TXT input file, as str or bytes.
+            Lines read as bytes are only decoded when they are not a plain
+            ASCII number
+            rejects (RejectLog): Where the rejected lines are counted. When
+            None, the rejected lines are reported once the lines are parsed
+
+        Returns:
+            IntBuffer: Numerical values packed as 64-bit integers
+        """
+        reject_log = RejectLog() if rejects is None else rejects
+        num_list = IntBuffer()
+        for num_batch in INT_PARSER.batches(lines, reject_log):
+            num_list.extend(num_batch)
+        if rejects is None:
+            reject_log.report()
+        return num_list
+
+    def filter_in_range(self, numbers):
+        """
+        This function lazily drops the numbers that do not fit in the
+        selected word width, counting each of them as rejected
+
+        Args:
+            numbers (iterable): The numbers from the TXT file
+
+        Returns:
+            generator: The numbers that can be encoded
+        """
+        for number in numbers:
+            if self.converter.encoder.in_range(number):
+                yield number
+            else:
+                self.rejects.reject('out-of-range', number)
+
+    def drop_out_of_range(self, num_list):
+        """
+        This function removes the numbers that do not fit in the selected
+        word width
+
+        Args:
+            num_list (IntBuffer): The numbers from the TXT file
+
+        Returns:
+            IntBuffer: The numbers that can be encoded
+        """
+        return IntBuffer(self.filter_in_range(num_list))
+
+    @staticmethod
+    def lines_counter(lines):
+        """
+        This function counts the total number of lines in a TXT file
+        before cleaning any non-valid values
+
+        Args:
+            lines (list): List of lines from the TXT input file
+
+        Returns:
+            int: Total number of lines in the list before cleaning
+        """
+        total_count = 0
+
+        for _ in lines:
+            total_count += 1
+        return total_count
+
+    @staticmethod
+    def counter(counted_elements):
+        """
+        This function counts the total number of elements in an
+        iterable object
+
+        Args:
+            counted_elements (iterable): An iterable object
+
+        Returns:
+            int: Total number of elements in the list or set
+        """
+        count = 0
+        for _ in counted_elements:
+            count += 1
+        return count
+
+    def convert_in_parallel(self, numbers, writer, block_size=None):
+        """
+        This function splits the numbers into blocks, converts them in a
+        process pool and writes the records in the original order. At most
+        two blocks per worker are in flight, so an input that is still
+        being read is never loaded whole
+
+        Args:
+            numbers (iterable): The numbers from the TXT file
+            writer (ResultWriter): The writer of the results file
+            block_size (int): Numbers converted per task. Defaults to a
+            quarter of each worker's share when the count is known, and to
+            the writer's batch size otherwise
+
+        Returns:
+            dict: Per-worker totals keyed by process id, with the numbers
+            converted, the seconds spent and the cache hits and misses
+        """
+        if block_size is None:
+            if hasattr(numbers, '__len__'):
+                block_size = max(1, min(65_536, -(-len(numbers) // (self.options.workers * 4))))
+            else:
+                block_size = writer.batch_size
+        numbers = iter(numbers)
+        worker_stats = {}
+        pending = deque()
+
+        with ProcessPoolExecutor(max_workers=self.options.workers, initializer=init_worker,
+                                 initargs=(self.options.cache_size, self.options.width,
+                                           self.options.base)) as executor:
+            while True:
+                while len(pending) < self.options.workers * 2:
+                    block = list(islice(numbers, block_size))
+                    if not block:
+                        break
+                    pending.append(executor.submit(convert_block, block))
+                if not pending:
+                    break
+                result = pending.popleft().result()
+                writer.write_records(result['records'])
+                stats = worker_stats.setdefault(result['pid'], {'count': 0, 'seconds': 0.0})
+                stats['count'] += len(result['records'])
+                stats['seconds'] += result['seconds']
+                stats['hits'], stats['misses'] = result['hits'], result['misses']
+        return worker_stats
 
     def convert_numbers(self, num_list):
         """
-        This function takes the input list of numbers from the TXT file
-        and calculates its statistics
+        This function takes the input list of numbers from the TXT file,
+        converts them and writes the results into the results file,
+        'ConvertionResults.txt' by default
 
         Args:
             num_list (list): The list of numbers from the TXT file
 
         Returns:
-            int|float: The statistics of the input list of numbers
+            None
         """
         start_time = time.time()
+        instrumentation = self.instrumentation
+
+        with self.output.open_writer() as writer:
+            if self.options.workers > 1:
+                with instrumentation.span('convert'):
+                    worker_stats = self.convert_in_parallel(num_list, writer)
+            else:
+                worker_stats = {}
+                numbers = iter(num_list)
+                while True:
+                    block = list(islice(numbers, self.output.batch_size))
+                    if not block:
+                        break
+                    with instrumentation.span('convert'):
+                        records = self.converter.format_records(block)
+                    with instrumentation.span('write'):
+                        writer.write_records(records)
+
+            with instrumentation.span('write'):
+                writer.flush()
+                self.report_summary(writer, len(num_list), start_time, worker_stats)
+
+    def report_summary(self, writer, converted_count, start_time, worker_stats):
+        """
+        This function writes the counts and the elapsed time after the
+        converted numbers, adding the cache and per-worker figures on the
+        console
+
+        Args:
+            writer (ResultWriter): The writer of the results file
+            converted_count (int): Number of converted numbers
+            start_time (float): Time when the conversion started
+            worker_stats (dict): Per-worker totals of the parallel mode,
+            empty when the numbers were converted in this process
 
+        Returns:
+            None
+        """
         output_initial_count = self.total_lines
-        output_cleaned_count = self.counter(num_list)
-        removed_elements = output_initial_count - output_cleaned_count
-
-        with open('ConvertionResults.txt', 'w', encoding='utf-8') as file:
-            for number in num_list:
-                if number == 0:
-                    binary_transformation = '0'
-                    hex_transformation = '0'
-                else:
-                    binary_transformation = self.dec_to_bin_converter(number)
-                    hex_transformation = self.dec_to_bin_to_hex_converter(number)
-                print(f'Decimal: {number}, Binary: {binary_transformation}, '
-                      f'Hex: {hex_transformation}\n')
-                file.write(f'Decimal: {number}, Binary: {binary_transformation}, '
-                           f'Hex: {hex_transformation}\n')
+        removed_elements = output_initial_count - converted_count
+        if worker_stats:
+            cache_hits = sum(stats['hits'] for stats in worker_stats.values())
+            cache_misses = sum(stats['misses'] for stats in worker_stats.values())
+        else:
+            cache_info = self.converter.convert_number.cache_info()
+            cache_hits, cache_misses = cache_info.hits, cache_info.misses
+        self.instrumentation.count('cache_hits', cache_hits)
+        self.instrumentation.count('cache_misses', cache_misses)
 
         end_time = time.time()
+        worker_summary = ''.join(
+            f'\nWorker {pid}: {stats["count"]} numbers in {stats["seconds"]:.3f} s '
+            f'({stats["count"] / max(stats["seconds"], 1e-9):.0f} numbers/s)\n'
+            for pid, stats in worker_stats.items())
+
+        writer.write_summary(
+            f'\n\nTotal Initial Count: {output_initial_count}'
+            f'\nRemoved a total of {removed_elements} elements\n'
+            f'\nElapsed Time: {end_time - start_time} s',
+            f'\n\nTotal Initial Count: {output_initial_count}\n'
+            f'\nRemoved a total of {removed_elements} elements\n'
+            f'\nCache hits: {cache_hits}, misses: {cache_misses}\n'
+            f'{worker_summary}'
+            f'\nElapsed Time: {end_time - start_time} s\n')
+
+
+def init_worker(cache_size, width, base):
+    """
+    Creates the converter reused by a worker process of the parallel mode,
+    so its cache lives across the blocks the worker converts
+
+    Args:
+        cache_size (int): Number of recent conversions kept in the LRU cache
+        width (int): Bits of the two's complement word, or None
+        base (int): Base of the second representation
+
+    Returns:
+        None
+    """
+    WORKER_STATE['converter'] = NumberConverter(width, base, cache_size)
+
 
-        print(f'\n\nTotal Initial Count: {output_initial_count}')
-        print(f'\nRemoved a total of {removed_elements} elements')
-        print(f'\nElapsed Time: {end_time - start_time} s')
+def convert_block(numbers):
+    """
+    Converts a block of numbers inside a worker process of the parallel mode
+
+    Args:
+        numbers (list): The block of numbers
+
+    Returns:
+        dict: The formatted records, the process id, the seconds spent and
+        the cumulative cache hits and misses of the worker
+    """
+    start_time = time.perf_counter()
+    converter = WORKER_STATE['converter']
+    records = converter.format_records(numbers)
+    cache_info = converter.convert_number.cache_info()
+    return {'records': records, 'pid': os.getpid(),
+            'seconds': time.perf_counter() - start_time,
+            'hits': cache_info.hits, 'misses': cache_info.misses}
 
-        with open('ConvertionResults.txt', 'a', encoding='utf-8') as file:
-            file.write(f'\n\nTotal Initial Count: {output_initial_count}')
-            file.write(f'\nRemoved a total of {removed_elements} elements\n')
-            file.write(f'\nElapsed Time: {end_time - start_time} s')
+
+def main():
+    """
+    Parses the command line arguments and runs the program
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        prog='python3 convert_numbers.py',
+        description='Converts the numbers of a TXT input file into binary and hexadecimal')
+    parser.add_argument('file_path',
+                        help='TXT input file with one integer per line, or - for the '
+                             'standard input')
+    ConversionOptions.add_arguments(parser)
+    parser.add_argument('--batch-size', type=int, default=16_384,
+                        help='records written to the results file at once (default: 16384)')
+    OutputOptions.add_arguments(parser)
+    Instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error('--batch-size must be at least 1')
+
+    try:
+        data_processor = ConvertNumbers(args.file_path,
+                                        options=ConversionOptions.from_args(args),
+                                        output=OutputOptions.from_args(
+                                            args, 'ConvertionResults.txt', args.batch_size),
+                                        instrumentation=Instrumentation.from_args(args))
+    except ValueError as error:
+        parser.error(str(error))
+    data_processor.process_txt_file()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print('Usage: python3 convert_numbers.py <file_path>')
-    else:
-        file_path = sys.argv[1]
-        data_processor = ConvertNumbers(file_path)
-        data_processor.process_txt_file()
+    main()
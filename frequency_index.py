@@ -0,0 +1,203 @@
+"""
+Frequency Index
+
+This module contains the frequency index used by 'compute_statistics.py':
+a hash table of value counts built in a single pass that answers the mode,
+the tied modes, the most frequent values, the median, percentiles and a
+histogram
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+from collections import Counter
+
+from order_statistics import histogram, percentile_position, value_at_rank
+
+
+class FrequencyIndex:
+    """
+    Class to count how many times each distinct value appears in a dataset
+    """
+
+    def __init__(self, values=()):
+        """
+        Initializes the FrequencyIndex object
+
+        Args:
+            values (iterable): The values of the dataset
+
+        Returns:
+            None
+        """
+        self.counts = Counter()
+        self.total = 0
+        self.update(values)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def update(self, values):
+        """
+        This function adds every value of an iterable to the index
+
+        Args:
+            values (iterable): The values to be counted
+
+        Returns:
+            None
+        """
+        if not hasattr(values, '__len__'):
+            values = list(values)
+        self.counts.update(values)
+        self.total += len(values)
+
+    def merge(self, other):
+        """
+        This function adds the counts of another index into this one
+
+        Args:
+            other (FrequencyIndex): The index to be merged
+
+        Returns:
+            FrequencyIndex: This object, after the merge
+        """
+        self.counts.update(other.counts)
+        self.total += other.total
+        return self
+
+    def max_frequency(self):
+        """
+        This function returns the highest frequency in the index
+
+        Returns:
+            int: The number of times the most frequent value appears
+        """
+        return max(self.counts.values())
+
+    def all_tied(self):
+        """
+        This function checks whether every distinct value appears the same
+        number of times, in which case the dataset has no mode
+
+        Returns:
+            bool: True if all the frequencies are equal
+        """
+        frequencies = iter(self.counts.values())
+        first = next(frequencies, None)
+        return all(frequency == first for frequency in frequencies)
+
+    def modes(self):
+        """
+        This function returns every value that has the highest frequency
+
+        Returns:
+            list: The most frequent values in ascending order
+        """
+        max_freq = self.max_frequency()
+        return sorted(value for value, frequency in self.counts.items()
+                      if frequency == max_freq)
+
+    def most_common(self, k):
+        """
+        This function returns the k most frequent values
+
+        Args:
+            k (int): Number of values to be returned
+
+        Returns:
+            list: Tuples of (value, frequency) from the most frequent down
+        """
+        return self.counts.most_common(k)
+
+    def sorted_items(self):
+        """
+        This function returns the distinct values with their frequencies
+
+        Returns:
+            list: Tuples of (value, frequency) in ascending order of value
+        """
+        return sorted(self.counts.items())
+
+    def value_at(self, rank, items=None):
+        """
+        This function returns the value found at a 0-based rank of the
+        dataset once sorted, without expanding the repeated values
+
+        Args:
+            rank (int): The 0-based position in the sorted dataset
+            items (list): Optional result of 'sorted_items' to reuse
+
+        Returns:
+            int|float: The value at that rank
+        """
+        return value_at_rank(items if items is not None else self.sorted_items(), rank)
+
+    def median(self, items=None):
+        """
+        This function returns the median of the dataset
+
+        Args:
+            items (list): Optional result of 'sorted_items' to reuse
+
+        Returns:
+            int|float: The median
+        """
+        items = items if items is not None else self.sorted_items()
+        mid_value_1 = self.value_at(self.total // 2, items)
+        if self.total % 2 != 0:
+            return mid_value_1
+        return (mid_value_1 + self.value_at((self.total - 1) // 2, items)) / 2
+
+    def percentile(self, percent, items=None):
+        """
+        This function returns a percentile of the dataset, interpolating
+        linearly between the two closest ranks
+
+        Args:
+            percent (int|float): The percentile to compute, from 0 to 100
+            items (list): Optional result of 'sorted_items' to reuse
+
+        Returns:
+            float: The value below which the given percent of the data falls
+        """
+        items = items if items is not None else self.sorted_items()
+        lower_index, upper_index, fraction = percentile_position(self.total, percent)
+        lower = value_at_rank(items, lower_index)
+        return lower + (value_at_rank(items, upper_index) - lower) * fraction
+
+    def histogram(self, bins, value_range=None):
+        """
+        This function groups the dataset into equal-width bins, between its
+        smallest and largest values unless a range is given
+
+        Args:
+            bins (int): Number of bins
+            value_range (tuple): Optional (low, high) bounds of the bins.
+            Values outside them are left out
+
+        Returns:
+            list: Tuples of (lower edge, upper edge, count). The last bin
+            includes its upper edge
+        """
+        if value_range is None:
+            value_range = (min(self.counts), max(self.counts))
+        return histogram(self.counts.items(), bins, *value_range)
+
+
+def format_mode(frequencies):
+    """
+    This function formats the mode the way it is reported in
+    'StatisticsResults.txt'. Every backend formats its mode here
+
+    Args:
+        frequencies (FrequencyIndex): The frequency of each distinct number,
+        or any object with the same 'all_tied' and 'modes' methods
+
+    Returns:
+        int|float|str: The single mode, the tied modes separated by commas,
+        or 'N/A' if every value has the same frequency
+    """
+    if frequencies.all_tied():
+        return 'N/A'
+    mode_nums = frequencies.modes()
+    return mode_nums[0] if len(mode_nums) == 1 else ', '.join(str(num) for num in mode_nums)
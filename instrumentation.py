@@ -0,0 +1,235 @@
+"""
+Instrumentation
+
+This module contains the instrumentation shared by the three programs:
+timed spans around the stages of a run, counters, and opt-in cProfile and
+tracemalloc hooks. A run is written as JSON lines, one record per span,
+one with the counters, and one per enabled hook. When no output is
+configured every span is a shared no-op context manager
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import cProfile
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+NULL_SPAN = nullcontext()
+TOP_ENTRIES = 15
+
+
+class Instrumentation:
+    """
+    Class to time the stages of a run and count what it processed. Spans
+    with the same name are added together, keeping how many times they ran
+    """
+
+    def __init__(self, trace_path=None, profile_path=None, trace_memory=False):
+        """
+        Initializes the Instrumentation object
+
+        Args:
+            trace_path (str): File the JSON lines are appended to, or None
+            to keep the records out of any file. The instrumentation is
+            disabled when no trace, profile or memory tracing is requested
+            profile_path (str): File the cProfile statistics are dumped to,
+            or None to run without the profiler
+            trace_memory (bool): Whether allocations are traced with
+            tracemalloc to report the peak and the largest allocation sites
+
+        Returns:
+            None
+        """
+        self.trace_path = trace_path
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.enabled = trace_path is not None or profile_path is not None or trace_memory
+        self.spans = {}
+        self.counters = {}
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """
+        This function adds the instrumentation options to a command line
+        parser
+
+        Args:
+            parser (argparse.ArgumentParser): The parser of a program
+
+        Returns:
+            None
+        """
+        parser.add_argument('--trace', default=None, metavar='FILE',
+                            help='append the stage timings and counters of the run to '
+                                 'FILE as JSON lines')
+        parser.add_argument('--profile', default=None, metavar='FILE',
+                            help='run under cProfile and dump its statistics to FILE')
+        parser.add_argument('--trace-memory', action='store_true',
+                            help='trace allocations with tracemalloc and add the peak and '
+                                 'the largest allocation sites to the --trace records')
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        This function builds the instrumentation selected on the command line
+
+        Args:
+            args (argparse.Namespace): The parsed options of 'add_arguments'
+
+        Returns:
+            Instrumentation: The configured instrumentation
+        """
+        return cls(args.trace, args.profile, args.trace_memory)
+
+    def span(self, name):
+        """
+        This function returns a context manager timing a stage
+
+        Args:
+            name (str): Name of the stage
+
+        Returns:
+            context manager: The timed span, or a no-op when disabled
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        """
+        This function times the body of a 'with' statement in nanoseconds
+
+        Args:
+            name (str): Name of the stage
+
+        Returns:
+            generator: The context manager of the span
+        """
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            calls, total_ns = self.spans.get(name, (0, 0))
+            self.spans[name] = (calls + 1, total_ns + elapsed_ns)
+
+    def count(self, name, value=1):
+        """
+        This function adds to a counter
+
+        Args:
+            name (str): Name of the counter
+            value (int): Amount added
+
+        Returns:
+            None
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_parsed(self, input_bytes, lines, values):
+        """
+        This function adds to the counters of the input parsed by a run:
+        its bytes and lines, the values found in them and the rejected lines
+
+        Args:
+            input_bytes (int): Bytes of input read
+            lines (int): Lines of input read
+            values (int): Lines holding a valid value
+
+        Returns:
+            None
+        """
+        self.count('bytes', input_bytes)
+        self.count('lines', lines)
+        self.count('values', values)
+        self.count('rejected', lines - values)
+
+    @contextmanager
+    def session(self, program, file_path):
+        """
+        This function wraps a whole run: it starts the enabled hooks, times
+        the run as the 'total' span and writes the records once it ends
+
+        Args:
+            program (str): Name of the program
+            file_path (str): Path of the input file
+
+        Returns:
+            generator: The context manager of the run
+        """
+        if not self.enabled:
+            yield self
+            return
+
+        profiler = cProfile.Profile() if self.profile_path else None
+        if self.trace_memory:
+            tracemalloc.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            with self.span('total'):
+                yield self
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            records = self.records(program, file_path, profiler)
+            if self.trace_memory:
+                tracemalloc.stop()
+            self.write_records(records)
+
+    def records(self, program, file_path, profiler=None):
+        """
+        This function builds the JSON records of a run
+
+        Args:
+            program (str): Name of the program
+            file_path (str): Path of the input file
+            profiler (cProfile.Profile): The profiler of the run, if any
+
+        Returns:
+            list: The records, as dictionaries
+        """
+        run = {'program': program, 'input': file_path, 'pid': os.getpid()}
+        records = [{**run, 'event': 'span', 'name': name, 'calls': calls, 'ns': total_ns}
+                   for name, (calls, total_ns) in self.spans.items()]
+        records.append({**run, 'event': 'counters', 'counters': self.counters})
+
+        if self.trace_memory:
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ENTRIES]
+            records.append({**run, 'event': 'memory', 'peak_bytes': peak_bytes,
+                            'top': [{'location': str(stat.traceback), 'bytes': stat.size,
+                                     'blocks': stat.count} for stat in top]})
+
+        if profiler is not None:
+            profiler.dump_stats(self.profile_path)
+            stats = pstats.Stats(profiler)
+            top = sorted(stats.stats.items(), key=lambda item: item[1][3],
+                         reverse=True)[:TOP_ENTRIES]
+            records.append({**run, 'event': 'profile', 'path': self.profile_path,
+                            'top': [{'function': f'{path}:{line}({name})', 'calls': calls,
+                                     'tottime': tottime, 'cumtime': cumtime}
+                                    for (path, line, name), (_, calls, tottime, cumtime, _)
+                                    in top]})
+        return records
+
+    def write_records(self, records):
+        """
+        This function appends records to the trace file as JSON lines
+
+        Args:
+            records (list): The records, as dictionaries
+
+        Returns:
+            None
+        """
+        if self.trace_path is None:
+            return
+        with open(self.trace_path, 'a', encoding='utf-8') as file:
+            file.writelines(json.dumps(record) + '\n' for record in records)
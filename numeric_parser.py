@@ -0,0 +1,228 @@
+"""
+Numeric Parser
+
+This module contains the bulk number parser shared by 'compute_statistics.py'
+and 'convert_numbers.py'. Lines are parsed in batches: a batch without
+rejected lines is converted in a single C-level pass, and the lines of any
+other batch are screened by the bytes they contain, so most invalid lines
+are rejected without raising an exception. Rejected lines are counted and
+only the first few of them are printed
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+from itertools import islice
+
+BATCH_LINES = 4096
+SAMPLE_LINES = 10
+
+# Besides the characters of a number, every ASCII byte str.strip() removes
+# is accepted, since a decoded line may still be a number once stripped
+SPACE_BYTES = bytes(byte for byte in range(128) if chr(byte).isspace())
+FLOAT_BYTES = b'0123456789+-._eEinfatyINFATY' + SPACE_BYTES
+INT_BYTES = b'0123456789+-_' + SPACE_BYTES
+
+REJECT_MESSAGES = {
+    'empty': 'Skipping empty line: ',
+    'invalid': 'Skipping invalid value: ',
+    'out-of-range': 'Skipping out-of-range value: ',
+}
+REJECT_LABELS = {
+    'empty': 'empty lines',
+    'invalid': 'invalid values',
+    'out-of-range': 'out-of-range values',
+}
+
+
+class RejectLog:
+    """
+    Class to count the rejected lines of a run by their reason, printing
+    only the first of them
+    """
+
+    def __init__(self, samples=SAMPLE_LINES):
+        """
+        Initializes the RejectLog object
+
+        Args:
+            samples (int): Number of rejected lines printed as they are
+            found, or None to print every rejected line
+
+        Returns:
+            None
+        """
+        self.samples = samples
+        self.counts = dict.fromkeys(REJECT_MESSAGES, 0)
+        self.shown = 0
+
+    @property
+    def total(self):
+        """
+        This function returns the number of rejected lines
+
+        Returns:
+            int: The rejected lines of every reason
+        """
+        return sum(self.counts.values())
+
+    def reject(self, reason, value):
+        """
+        This function counts a rejected line, printing it while the samples
+        are not exhausted
+
+        Args:
+            reason (str): Why the line was rejected, a key of REJECT_MESSAGES
+            value (str|int): The rejected value, as shown on the console
+
+        Returns:
+            None
+        """
+        self.counts[reason] += 1
+        if self.samples is None or self.shown < self.samples:
+            self.shown += 1
+            print(f'{REJECT_MESSAGES[reason]}{value}')
+
+    def report(self):
+        """
+        This function prints how many rejected lines were not shown, with
+        the number of lines rejected for every reason
+
+        Returns:
+            None
+        """
+        hidden = self.total - self.shown
+        if hidden:
+            totals = ', '.join(f'{count} {REJECT_LABELS[reason]}'
+                               for reason, count in self.counts.items() if count)
+            print(f'Skipped {hidden} more lines ({totals} in total)')
+
+
+class NumberParser:
+    """
+    Class to parse lines into numbers with the rules of 'float()' or
+    'int()'. A line is valid when its stripped text converts, and lines read
+    as bytes are only decoded when they are not a plain ASCII number
+    """
+
+    def __init__(self, convert, number_bytes):
+        """
+        Initializes the NumberParser object
+
+        Args:
+            convert (callable): The conversion, 'float' or 'int'
+            number_bytes (bytes): Every ASCII byte a valid stripped line
+            may contain. An ASCII line with any other byte is rejected
+            without being converted
+
+        Returns:
+            None
+        """
+        self.convert = convert
+        self.number_bytes = number_bytes
+
+    def parse_line(self, line, rejects):
+        """
+        This function extracts the number of a single line
+
+        Args:
+            line (str|bytes): A line from the TXT input file
+            rejects (RejectLog): Where a rejected line is counted
+
+        Returns:
+            float|int|None: The number, or None if the line is empty or
+            not a number
+        """
+        if isinstance(line, bytes):
+            stripped_line = line.strip()
+            if stripped_line:
+                try:
+                    return self.convert(stripped_line)
+                except ValueError:
+                    pass
+            line = line.decode('utf-8')
+
+        stripped_line = line.strip()
+        if not stripped_line:
+            rejects.reject('empty', stripped_line)
+            return None
+        try:
+            return self.convert(stripped_line)
+        except ValueError:
+            rejects.reject('invalid', stripped_line)
+            return None
+
+    def parse_batch(self, lines, rejects):
+        """
+        This function extracts the numbers of a batch of lines read as
+        bytes. Empty lines and ASCII lines with a byte that cannot be part
+        of a number are rejected without converting them, and the remaining
+        lines fall back to 'parse_line' when they do not convert
+
+        Args:
+            lines (list): Lines from the TXT input file, as bytes
+            rejects (RejectLog): Where the rejected lines are counted
+
+        Returns:
+            list: The numbers of the valid lines, in input order
+        """
+        convert = self.convert
+        number_bytes = self.number_bytes
+        values = []
+        append = values.append
+        for line in lines:
+            stripped_line = line.strip()
+            if not stripped_line:
+                rejects.reject('empty', '')
+                continue
+            residue = stripped_line.translate(None, number_bytes)
+            if not residue:
+                try:
+                    append(convert(stripped_line))
+                    continue
+                except ValueError:
+                    pass
+            elif residue.isascii():
+                rejects.reject('invalid', stripped_line.decode('ascii').strip())
+                continue
+            value = self.parse_line(line, rejects)
+            if value is not None:
+                append(value)
+        return values
+
+    def batches(self, lines, rejects, batch_lines=BATCH_LINES):
+        """
+        This function lazily parses lines in batches. A batch is first
+        converted in a single pass, which only succeeds when every line is
+        a number; after a batch with rejected lines the next one goes
+        straight to 'parse_batch'
+
+        Args:
+            lines (iterable): Lines from the TXT input file, as str or bytes
+            rejects (RejectLog): Where the rejected lines are counted
+            batch_lines (int): Number of lines parsed at once
+
+        Returns:
+            generator: Lists with the numbers of every batch, in input order
+        """
+        lines = iter(lines)
+        clean = True
+        while True:
+            batch = list(islice(lines, batch_lines))
+            if not batch:
+                return
+            if not isinstance(batch[0], bytes):
+                values = [value for value in (self.parse_line(line, rejects) for line in batch)
+                          if value is not None]
+            elif clean:
+                try:
+                    values = list(map(self.convert, batch))
+                except ValueError:
+                    values = self.parse_batch(batch, rejects)
+            else:
+                values = self.parse_batch(batch, rejects)
+            clean = len(values) == len(batch)
+            yield values
+
+
+FLOAT_PARSER = NumberParser(float, FLOAT_BYTES)
+INT_PARSER = NumberParser(int, INT_BYTES)
@@ -0,0 +1,92 @@
+"""
+Numeric Storage
+
+This module contains the compact storage used for the parsed values of
+'convert_numbers.py': integers packed into a typed 64-bit buffer, with the
+few values that do not fit kept aside as Python integers
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+from array import array
+
+
+class IntBuffer:
+    """
+    Class to store integers in an array('q'). Values outside the signed
+    64-bit range are stored in the 'overflow' side table keyed by their
+    position, and a 0 placeholder keeps their slot in the array
+    """
+
+    def __init__(self, values=()):
+        """
+        Initializes the IntBuffer object
+
+        Args:
+            values (iterable): Initial integers
+
+        Returns:
+            None
+        """
+        self.values = array('q')
+        self.overflow = {}
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        if not self.overflow:
+            return iter(self.values)
+        return (self.overflow.get(index, value) for index, value in enumerate(self.values))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self.values)
+        return self.overflow.get(index, self.values[index])
+
+    def append(self, value):
+        """
+        This function adds an integer at the end of the buffer
+
+        Args:
+            value (int): The integer to be stored
+
+        Returns:
+            None
+        """
+        try:
+            self.values.append(value)
+        except OverflowError:
+            self.overflow[len(self.values)] = value
+            self.values.append(0)
+
+    def extend(self, values):
+        """
+        This function adds a list of integers at the end of the buffer,
+        packing them in a single call when all of them fit in 64 bits
+
+        Args:
+            values (list): The integers to be stored
+
+        Returns:
+            None
+        """
+        try:
+            self.values.fromlist(values)
+        except OverflowError:
+            for value in values:
+                self.append(value)
+
+    def memoryview(self):
+        """
+        This function exposes the packed 64-bit values without copying
+        them. Slots listed in 'overflow' hold a 0 placeholder
+
+        Returns:
+            memoryview: A view over the packed values
+        """
+        return memoryview(self.values)
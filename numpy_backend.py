@@ -0,0 +1,202 @@
+"""
+NumPy Backend
+
+This module contains the optional vectorized backend of
+'compute_statistics.py'. It is only used when NumPy is installed and
+produces the same results as the pure-Python backend
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+from functools import cached_property
+
+from frequency_index import format_mode
+from statistics_pipeline import StatisticsState
+from streaming_statistics import PowerSums
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+
+def is_available():
+    """
+    This function checks whether NumPy can be used
+
+    Returns:
+        bool: True if NumPy is installed
+    """
+    return np is not None
+
+
+class UniqueCounts:
+    """
+    Class to answer the mode of the unique values of an array and their
+    counts, with the same methods as a FrequencyIndex
+    """
+
+    def __init__(self, unique_values, counts):
+        """
+        Initializes the UniqueCounts object
+
+        Args:
+            unique_values (ndarray): The distinct values in ascending order
+            counts (ndarray): How many times each distinct value appears
+
+        Returns:
+            None
+        """
+        self.unique_values = unique_values
+        self.counts = counts
+
+    def all_tied(self):
+        """
+        This function checks whether every distinct value appears the same
+        number of times
+
+        Returns:
+            bool: True if all the counts are equal
+        """
+        return bool(self.counts.min() == self.counts.max())
+
+    def modes(self):
+        """
+        This function returns every value with the highest count
+
+        Returns:
+            list: The most frequent values in ascending order
+        """
+        return self.unique_values[self.counts == self.counts.max()].tolist()
+
+
+class NumpyStatistics(StatisticsState):
+    """
+    Class to compute descriptive statistics over a contiguous float64 array
+    """
+
+    block_size = 1_048_576
+
+    def __init__(self, num_list, **histogram_options):
+        """
+        Initializes the NumpyStatistics object
+
+        Args:
+            num_list (list|array): The numbers to compute the statistics of.
+            An array('d') is wrapped without copying
+            **histogram_options: The histogram bins and range accepted by
+            StatisticsState
+
+        Returns:
+            None
+        """
+        if getattr(num_list, 'typecode', None) == 'd':
+            super().__init__(np.frombuffer(num_list, dtype=np.float64), **histogram_options)
+        else:
+            super().__init__(np.ascontiguousarray(num_list, dtype=np.float64),
+                             **histogram_options)
+
+    def sequential_sum(self, values):
+        """
+        This function adds the values from left to right, block by block,
+        so the rounding matches the pure-Python loop instead of NumPy's
+        pairwise summation
+
+        Args:
+            values (ndarray): The values to be added
+
+        Returns:
+            float: The result of the addition
+        """
+        total = 0.0
+        for start in range(0, values.size, self.block_size):
+            block = values[start:start + self.block_size].copy()
+            block[0] += total
+            total = float(np.cumsum(block)[-1])
+        return total
+
+    def sum_values(self):
+        """
+        This function adds the numbers from left to right
+
+        Returns:
+            float: The sum of the numbers
+        """
+        return self.sequential_sum(self.num_list)
+
+    def sum_squared_deviations(self, mean_val):
+        """
+        This function adds the squared deviations of the numbers from
+        their mean, from left to right
+
+        Args:
+            mean_val (int|float): The mean of the numbers
+
+        Returns:
+            float: The sum of the squared deviations
+        """
+        deviations = self.num_list - float(mean_val)
+        return self.sequential_sum(deviations * deviations)
+
+    @cached_property
+    def median(self):
+        """
+        float: The median of the numbers, found with a partial sort around
+        the middle positions
+        """
+        mid_index_1 = self.count // 2
+        mid_index_2 = (self.count - 1) // 2
+        partitioned = np.partition(self.num_list, [mid_index_2, mid_index_1])
+        upper = float(partitioned[mid_index_1])
+        if self.count % 2 != 0:
+            return upper
+        return (upper + float(partitioned[mid_index_2])) / 2
+
+    @cached_property
+    def mode(self):
+        """
+        float|str: The mode of the numbers, found from the counts of the
+        unique values
+        """
+        return format_mode(UniqueCounts(*np.unique(self.num_list, return_counts=True)))
+
+    @cached_property
+    def sorted_items(self):
+        """
+        list: Tuples of (number, frequency) in ascending order, from the
+        unique values of the array
+        """
+        unique_values, counts = np.unique(self.num_list, return_counts=True)
+        return list(zip(unique_values.tolist(), counts.tolist()))
+
+    @cached_property
+    def power_sums(self):
+        """
+        PowerSums: The power sums of the deviations of the numbers, added
+        from left to right like the pure-Python backend
+        """
+        power_sums = PowerSums()
+        power_sums.count = self.count
+        power_sums.shift = float(self.num_list[0])
+        power_sums.minimum = self.min
+        power_sums.maximum = self.max
+        deviations = self.num_list - power_sums.shift
+        squares = deviations * deviations
+        power_sums.sums = [self.sequential_sum(deviations), self.sequential_sum(squares),
+                           self.sequential_sum(squares * deviations),
+                           self.sequential_sum(squares * squares)]
+        return power_sums
+
+    @cached_property
+    def min(self):
+        """
+        float: The smallest number
+        """
+        return float(self.num_list.min())
+
+    @cached_property
+    def max(self):
+        """
+        float: The largest number
+        """
+        return float(self.num_list.max())
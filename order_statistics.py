@@ -0,0 +1,222 @@
+"""
+Order Statistics
+
+This module contains the order statistics used by 'compute_statistics.py':
+linear-time selection of the k-th smallest value and a sorted view that is
+computed once and shared by the median, mode, percentiles and min/max
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import math
+import random
+
+
+def select(values, k):
+    """
+    This function returns the k-th smallest value (0-based) of a sequence
+    using introselect: quickselect with three-way partitioning, falling back
+    to a full sort if the partitions stop shrinking
+
+    Args:
+        values (iterable): The values to select from
+        k (int): The 0-based rank of the value to be returned
+
+    Returns:
+        int|float: The k-th smallest value
+    """
+    candidates = list(values)
+    if not 0 <= k < len(candidates):
+        raise IndexError('select rank out of range')
+
+    depth_limit = 2 * max(1, int(math.log2(len(candidates))))
+    while len(candidates) > 16:
+        if depth_limit == 0:
+            return sorted(candidates)[k]
+        depth_limit -= 1
+
+        pivot = sorted(random.sample(candidates, 3))[1]
+        lower = [value for value in candidates if value < pivot]
+        if k < len(lower):
+            candidates = lower
+            continue
+        equal_count = sum(1 for value in candidates if value == pivot)
+        if k < len(lower) + equal_count:
+            return pivot
+        k -= len(lower) + equal_count
+        candidates = [value for value in candidates if value > pivot]
+    return sorted(candidates)[k]
+
+
+def select_median(values):
+    """
+    This function returns the median of a sequence in linear expected time
+    without sorting it
+
+    Args:
+        values (list): The values to take the median from
+
+    Returns:
+        int|float: The median of the values
+    """
+    n = len(values)
+    mid_index_1 = n // 2
+    mid_index_2 = (n - 1) // 2
+    upper = select(values, mid_index_1)
+    if n % 2 != 0:
+        return upper
+    return (upper + select(values, mid_index_2)) / 2
+
+
+def percentile_position(count, percent):
+    """
+    This function locates a percentile between the two closest ranks of a
+    sorted dataset, for linear interpolation
+
+    Args:
+        count (int): Number of values in the dataset
+        percent (int|float): The percentile to locate, from 0 to 100
+
+    Returns:
+        tuple: The 0-based lower and upper ranks and the fraction of the
+        way from the lower value to the upper one
+    """
+    position = (count - 1) * percent / 100
+    lower_index = int(position)
+    upper_index = min(lower_index + 1, count - 1)
+    return lower_index, upper_index, position - lower_index
+
+
+def value_at_rank(items, rank):
+    """
+    This function returns the value found at a 0-based rank of a sorted
+    dataset given as distinct values with their frequencies
+
+    Args:
+        items (iterable): Tuples of (value, frequency) in ascending order
+        rank (int): The 0-based position in the sorted dataset
+
+    Returns:
+        int|float: The value at that rank
+    """
+    seen = 0
+    for value, frequency in items:
+        seen += frequency
+        if rank < seen:
+            return value
+    raise IndexError('rank out of range')
+
+
+def histogram(items, bins, low, high):
+    """
+    This function groups a dataset into equal-width bins between two
+    bounds. Values outside the bounds are left out
+
+    Args:
+        items (iterable): Tuples of (value, frequency)
+        bins (int): Number of bins
+        low (int|float): Lower edge of the first bin
+        high (int|float): Upper edge of the last bin
+
+    Returns:
+        list: Tuples of (lower edge, upper edge, count). The last bin
+        includes its upper edge
+    """
+    width = (high - low) / bins
+    bin_counts = [0] * bins
+    for value, frequency in items:
+        if low <= value <= high:
+            index = int((value - low) / width) if width else 0
+            bin_counts[min(index, bins - 1)] += frequency
+    return [(low + width * index, low + width * (index + 1), count)
+            for index, count in enumerate(bin_counts)]
+
+
+class SortedView:
+    """
+    Class to hold the values of a dataset sorted once, so every order
+    statistic can be answered from the same sorted copy
+    """
+
+    def __init__(self, values):
+        """
+        Initializes the SortedView object
+
+        Args:
+            values (iterable): The values of the dataset
+
+        Returns:
+            None
+        """
+        self.values = sorted(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def minimum(self):
+        """
+        This function returns the smallest value of the dataset
+
+        Returns:
+            int|float: The smallest value
+        """
+        return self.values[0]
+
+    def maximum(self):
+        """
+        This function returns the largest value of the dataset
+
+        Returns:
+            int|float: The largest value
+        """
+        return self.values[-1]
+
+    def median(self):
+        """
+        This function returns the median of the dataset
+
+        Returns:
+            int|float: The median
+        """
+        n = len(self.values)
+        even_num_median = (self.values[n // 2] + self.values[(n - 1) // 2]) / 2
+        return even_num_median if n % 2 == 0 else self.values[n // 2]
+
+    def percentile(self, percent):
+        """
+        This function returns a percentile of the dataset, interpolating
+        linearly between the two closest ranks
+
+        Args:
+            percent (int|float): The percentile to compute, from 0 to 100
+
+        Returns:
+            float: The value below which the given percent of the data falls
+        """
+        lower_index, upper_index, fraction = percentile_position(len(self.values), percent)
+        lower = self.values[lower_index]
+        return lower + (self.values[upper_index] - lower) * fraction
+
+    def runs(self):
+        """
+        This function yields each distinct value together with the number
+        of times it appears, in ascending order
+
+        Returns:
+            generator: Tuples of (value, frequency)
+        """
+        index = 0
+        n = len(self.values)
+        while index < n:
+            value = self.values[index]
+            end = index + 1
+            while end < n and self.values[end] == value:
+                end += 1
+            yield value, end - index
+            index = end
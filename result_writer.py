@@ -0,0 +1,195 @@
+"""
+Result Writer
+
+This module contains the buffered writer shared by the three programs to
+write their results file and echo it to the console. Records are
+collected in memory and written in batches, and the summary is written
+through the same open file. The settings of the results file and of the
+console output are grouped in OutputOptions
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import sys
+
+from numeric_parser import SAMPLE_LINES
+
+ECHO_MODES = ('all', 'progress', 'none')
+
+
+class ResultWriter:
+    """
+    Class to write the records of a results file in batches. The console
+    echo can show every record ('all'), only a running count of written
+    records ('progress') or nothing at all ('none')
+    """
+
+    def __init__(self, file_path, echo='all', batch_size=16_384):
+        """
+        Initializes the ResultWriter object
+
+        Args:
+            file_path (str): Path of the results file
+            echo (str): Console echo mode, one of 'all', 'progress' or 'none'
+            batch_size (int): Number of records buffered before they are
+            written
+
+        Returns:
+            None
+        """
+        if echo not in ECHO_MODES:
+            raise ValueError(f'Unknown echo mode: {echo}')
+        self.file_path = file_path
+        self.echo = echo
+        self.batch_size = batch_size
+        self.records = 0
+        self._file = None
+        self._buffer = []
+
+    def __enter__(self):
+        self._file = open(self.file_path, 'w', encoding='utf-8')
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+        self._file.close()
+
+    def write_record(self, record):
+        """
+        This function buffers a record, writing the buffer once it holds a
+        full batch
+
+        Args:
+            record (str): The record, as written to the results file
+
+        Returns:
+            None
+        """
+        self._buffer.append(record)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_records(self, records):
+        """
+        This function writes a block of already formatted records
+
+        Args:
+            records (list): The records, as written to the results file
+
+        Returns:
+            None
+        """
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        This function writes the buffered records to the results file and
+        echoes them according to the echo mode
+
+        Returns:
+            None
+        """
+        if not self._buffer:
+            return
+        self._file.write(''.join(self._buffer))
+        self.records += len(self._buffer)
+        if self.echo == 'all':
+            sys.stdout.write('\n'.join(self._buffer) + '\n')
+        elif self.echo == 'progress':
+            sys.stdout.write(f'{self.records} records written\n')
+        self._buffer = []
+
+    def write_summary(self, file_text, console_text=None):
+        """
+        This function writes the summary after the records, echoing it in
+        every mode but 'none'
+
+        Args:
+            file_text (str): The summary, as written to the results file
+            console_text (str): The summary, as printed to the console.
+            Defaults to the same text as the file
+
+        Returns:
+            None
+        """
+        self.flush()
+        self._file.write(file_text)
+        if self.echo != 'none':
+            sys.stdout.write(file_text if console_text is None else console_text)
+
+
+class OutputOptions:
+    """
+    Class to hold where a program writes its results and what it prints on
+    the console: the results file, the echo mode, the records written at
+    once and the rejected lines shown
+    """
+
+    def __init__(self, output_path, echo='all', batch_size=16_384, rejected_samples=SAMPLE_LINES):
+        """
+        Initializes the OutputOptions object
+
+        Args:
+            output_path (str): Path of the results file
+            echo (str): Console echo of the results, one of 'all',
+            'progress' or 'none'
+            batch_size (int): Number of records written to the results file
+            at once. Smaller batches show the first results sooner
+            rejected_samples (int): Number of rejected lines printed before
+            they are only counted, or None to print every rejected line
+
+        Returns:
+            None
+        """
+        self.output_path = output_path
+        self.echo = echo
+        self.batch_size = batch_size
+        self.rejected_samples = rejected_samples
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """
+        This function adds the console output options to a command line
+        parser
+
+        Args:
+            parser (argparse.ArgumentParser): The parser of the program
+
+        Returns:
+            None
+        """
+        parser.add_argument('--echo', choices=ECHO_MODES, default='all',
+                            help='console echo of the results (default: all)')
+        parser.add_argument('--rejected-samples', type=int, default=SAMPLE_LINES, metavar='N',
+                            help='rejected lines printed before they are only counted, '
+                                 f'-1 prints all of them (default: {SAMPLE_LINES})')
+
+    @classmethod
+    def from_args(cls, args, output_path, batch_size=16_384):
+        """
+        This function builds the output options selected on the command line
+
+        Args:
+            args (argparse.Namespace): The parsed options of 'add_arguments'
+            output_path (str): Path of the results file
+            batch_size (int): Number of records written to the results file
+            at once
+
+        Returns:
+            OutputOptions: The selected options
+        """
+        return cls(output_path, echo=args.echo, batch_size=batch_size,
+                   rejected_samples=None if args.rejected_samples < 0
+                   else args.rejected_samples)
+
+    def open_writer(self):
+        """
+        This function creates the writer of the results file, which opens
+        the file when its context is entered
+
+        Returns:
+            ResultWriter: The writer of the results file
+        """
+        return ResultWriter(self.output_path, self.echo, self.batch_size)
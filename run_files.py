@@ -0,0 +1,97 @@
+"""
+Run Files
+
+This module contains the management of the sorted runs that the
+bounded-memory structures spill to disk, 'SpillingSorter' in
+'streaming_statistics.py' and 'SpillingCounter' in 'spilling_counter.py'.
+Runs are written to a temporary directory created on the first spill,
+merged in passes of at most MERGE_FAN_IN runs so the number of open files
+stays bounded, and removed together with the directory once they are no
+longer needed. The format of a run is left to its owner
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import os
+import shutil
+import tempfile
+
+MERGE_FAN_IN = 64
+
+
+class RunFiles:
+    """
+    Class to name, compact and remove the run files of an external sort
+    """
+
+    def __init__(self, prefix, suffix):
+        """
+        Initializes the RunFiles object
+
+        Args:
+            prefix (str): Prefix of the temporary directory of the runs
+            suffix (str): File extension of a run, such as '.txt'
+
+        Returns:
+            None
+        """
+        self.prefix = prefix
+        self.suffix = suffix
+        self.created = 0
+        self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def new_path(self):
+        """
+        This function returns the path of a new run file, creating the
+        temporary directory on the first call
+
+        Returns:
+            str: Path inside the spill directory
+        """
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix=self.prefix)
+        self.created += 1
+        return os.path.join(self._spill_dir, f'run_{self.created}{self.suffix}')
+
+    @staticmethod
+    def compact(runs, merge_group, fan_in=MERGE_FAN_IN):
+        """
+        This function merges sorted runs in passes of at most MERGE_FAN_IN
+        runs, writing every merged group back as a new run and removing the
+        merged ones, until at most 'fan_in' runs are left
+
+        Args:
+            runs (list): Paths of the run files
+            merge_group (callable): Merges a list of run paths into a new
+            run file and returns its path
+            fan_in (int): Largest number of runs left after the passes
+
+        Returns:
+            list: Paths of at most 'fan_in' run files
+        """
+        while len(runs) > fan_in:
+            merged_runs = []
+            for start in range(0, len(runs), MERGE_FAN_IN):
+                group = runs[start:start + MERGE_FAN_IN]
+                merged_runs.append(merge_group(group))
+                for run in group:
+                    os.remove(run)
+            runs = merged_runs
+        return runs
+
+    def close(self):
+        """
+        This function removes the temporary directory with every run file
+
+        Returns:
+            None
+        """
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
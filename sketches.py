@@ -0,0 +1,393 @@
+"""
+Sketches
+
+This module contains the bounded-memory sketches used by the approximate
+mode of 'compute_statistics.py': a KLL sketch for the median and other
+quantiles and a Space-Saving summary for the most frequent values. Both
+are mergeable, so sketches built over separate pieces of the input can be
+combined into the sketch of the whole input
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import heapq
+import math
+import random
+
+from order_statistics import percentile_position, value_at_rank
+
+
+class KLLSketch:
+    """
+    Class to estimate quantiles of a stream with the KLL sketch. Values are
+    kept in a hierarchy of compactors, where a value at level h stands for
+    2**h values of the stream
+    """
+
+    def __init__(self, k=200, seed=0):
+        """
+        Initializes the KLLSketch object
+
+        Args:
+            k (int): Capacity of the top compactor. Larger values use more
+            memory and give a smaller rank error
+            seed (int): Seed of the coin flips used when compacting
+
+        Returns:
+            None
+        """
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self._random = random.Random(seed)
+
+    @classmethod
+    def for_error(cls, rank_error, seed=0):
+        """
+        This function builds a sketch sized for a target rank error
+
+        Args:
+            rank_error (float): Accepted normalized rank error, e.g. 0.01
+            seed (int): Seed of the coin flips used when compacting
+
+        Returns:
+            KLLSketch: An empty sketch
+        """
+        return cls(max(8, math.ceil((2.296 / rank_error) ** (1 / 0.9723))), seed)
+
+    def rank_error(self):
+        """
+        This function returns the normalized rank error of the sketch, the
+        empirical bound published for KLL sketches at 99% confidence
+
+        Returns:
+            float: The accepted error, as a fraction of the stream size
+        """
+        return 2.296 / self.k ** 0.9723
+
+    def capacity(self, level):
+        """
+        This function returns how many values a compactor can hold before
+        it is compacted
+
+        Args:
+            level (int): Level of the compactor
+
+        Returns:
+            int: The capacity of the compactor
+        """
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def size(self):
+        """
+        This function returns how many values the sketch holds in memory
+
+        Returns:
+            int: The number of stored values
+        """
+        return sum(len(compactor) for compactor in self.compactors)
+
+    def update(self, value):
+        """
+        This function adds a value of the stream to the sketch
+
+        Args:
+            value (float): The value to be added
+
+        Returns:
+            None
+        """
+        self.count += 1
+        self.compactors[0].append(value)
+        if len(self.compactors[0]) >= self.capacity(0):
+            self.compress()
+
+    def update_many(self, values):
+        """
+        This function adds a batch of values of the stream to the sketch
+
+        Args:
+            values (iterable): The values to be added
+
+        Returns:
+            None
+        """
+        bottom = self.compactors[0]
+        for value in values:
+            bottom.append(value)
+            self.count += 1
+            if len(bottom) >= self.capacity(0):
+                self.compress()
+                bottom = self.compactors[0]
+
+    def compress(self):
+        """
+        This function compacts every full compactor, sorting it and moving
+        every other value one level up
+
+        Returns:
+            None
+        """
+        level = 0
+        while level < len(self.compactors):
+            compactor = self.compactors[level]
+            if len(compactor) >= self.capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                compactor.sort()
+                kept = compactor.pop() if len(compactor) % 2 else None
+                offset = self._random.randint(0, 1)
+                self.compactors[level + 1].extend(compactor[offset::2])
+                compactor.clear()
+                if kept is not None:
+                    compactor.append(kept)
+            level += 1
+
+    def merge(self, other):
+        """
+        This function adds the values summarized by another sketch
+
+        Args:
+            other (KLLSketch): The sketch to be merged
+
+        Returns:
+            KLLSketch: This object, after the merge
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        self.compress()
+        return self
+
+    def weighted_items(self):
+        """
+        This function lists the stored values with the number of stream
+        values each of them stands for
+
+        Returns:
+            list: Tuples of (value, weight) in ascending order of value
+        """
+        return sorted((value, 2 ** level)
+                      for level, compactor in enumerate(self.compactors)
+                      for value in compactor)
+
+    def quantile(self, fraction):
+        """
+        This function estimates the value below which a fraction of the
+        stream falls, interpolating linearly between the two closest ranks
+        like 'FrequencyIndex.percentile', so a sketch that still holds every
+        value returns the exact quantile
+
+        Args:
+            fraction (float): The quantile to estimate, from 0 to 1
+
+        Returns:
+            float: The estimated quantile
+        """
+        weighted = self.weighted_items()
+        total = sum(weight for _, weight in weighted)
+        lower_index, upper_index, position = percentile_position(total, fraction * 100)
+        lower = value_at_rank(weighted, lower_index)
+        return lower + (value_at_rank(weighted, upper_index) - lower) * position
+
+    def to_dict(self):
+        """
+        This function converts the sketch into JSON-serializable values
+
+        Returns:
+            dict: The state of the sketch
+        """
+        return {'k': self.k, 'count': self.count, 'compactors': self.compactors}
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        This function rebuilds a sketch saved by 'to_dict'
+
+        Args:
+            state (dict): The saved state
+
+        Returns:
+            KLLSketch: The rebuilt sketch
+        """
+        sketch = cls(state['k'])
+        sketch.count = state['count']
+        sketch.compactors = [list(compactor) for compactor in state['compactors']]
+        return sketch
+
+
+class SpaceSaving:
+    """
+    Class to find the most frequent values of a stream with the
+    Space-Saving summary. At most 'capacity' values are counted; a new value
+    replaces the least counted one and inherits its count, so estimated
+    counts never undercount and overcount by at most count / capacity
+    """
+
+    def __init__(self, capacity=1000):
+        """
+        Initializes the SpaceSaving object
+
+        Args:
+            capacity (int): Number of values counted at the same time
+
+        Returns:
+            None
+        """
+        self.capacity = capacity
+        self.count = 0
+        self.counts = {}
+        self._heap = []
+
+    @classmethod
+    def for_error(cls, count_error):
+        """
+        This function builds a summary sized for a target count error
+
+        Args:
+            count_error (float): Accepted overcount, as a fraction of the
+            stream size, e.g. 0.001
+
+        Returns:
+            SpaceSaving: An empty summary
+        """
+        return cls(math.ceil(1 / count_error))
+
+    def count_error(self):
+        """
+        This function returns the largest overcount of any estimated count
+
+        Returns:
+            int: The bound on the overcount, 0 while the counts are exact
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return self.count // self.capacity
+
+    def update(self, value, increment=1):
+        """
+        This function counts a value of the stream
+
+        Args:
+            value (float): The value to be counted
+            increment (int): Number of occurrences to add
+
+        Returns:
+            None
+        """
+        self.count += increment
+        if value in self.counts:
+            self.counts[value] += increment
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[value] = increment
+            heapq.heappush(self._heap, (increment, value))
+            return
+        while True:
+            min_count, min_value = heapq.heappop(self._heap)
+            if self.counts[min_value] == min_count:
+                break
+            heapq.heappush(self._heap, (self.counts[min_value], min_value))
+        del self.counts[min_value]
+        self.counts[value] = min_count + increment
+        heapq.heappush(self._heap, (min_count + increment, value))
+
+    def update_many(self, values):
+        """
+        This function counts a batch of values of the stream
+
+        Args:
+            values (iterable): The values to be counted
+
+        Returns:
+            None
+        """
+        for value in values:
+            self.update(value)
+
+    def merge(self, other):
+        """
+        This function adds the counts of another summary. A value missing
+        from a full summary is credited with that summary's smallest count,
+        which keeps the merged counts from undercounting
+
+        Args:
+            other (SpaceSaving): The summary to be merged
+
+        Returns:
+            SpaceSaving: This object, after the merge
+        """
+        own_floor = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        other_floor = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        merged = {value: count + other.counts.get(value, other_floor)
+                  for value, count in self.counts.items()}
+        for value, count in other.counts.items():
+            if value not in merged:
+                merged[value] = count + own_floor
+        self.counts = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1]))
+        self.count += other.count
+        self._heap = [(count, value) for value, count in self.counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+    def all_tied(self):
+        """
+        This function checks whether every counted value has the same count
+
+        Returns:
+            bool: True if all the estimated counts are equal
+        """
+        return len(set(self.counts.values())) <= 1
+
+    def modes(self):
+        """
+        This function returns the values with the highest estimated count
+
+        Returns:
+            list: The most frequent values in ascending order
+        """
+        max_freq = max(self.counts.values())
+        return sorted(value for value, count in self.counts.items() if count == max_freq)
+
+    def most_common(self, k):
+        """
+        This function returns the k values with the highest estimated count
+
+        Args:
+            k (int): Number of values to be returned
+
+        Returns:
+            list: Tuples of (value, estimated count) from the most frequent down
+        """
+        return heapq.nlargest(k, self.counts.items(), key=lambda item: item[1])
+
+    def to_dict(self):
+        """
+        This function converts the summary into JSON-serializable values
+
+        Returns:
+            dict: The state of the summary
+        """
+        return {'capacity': self.capacity, 'count': self.count,
+                'counts': list(self.counts.items())}
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        This function rebuilds a summary saved by 'to_dict'
+
+        Args:
+            state (dict): The saved state
+
+        Returns:
+            SpaceSaving: The rebuilt summary
+        """
+        summary = cls(state['capacity'])
+        summary.count = state['count']
+        summary.counts = dict((value, count) for value, count in state['counts'])
+        summary._heap = [(count, value) for value, count in summary.counts.items()]
+        heapq.heapify(summary._heap)
+        return summary
@@ -0,0 +1,276 @@
+"""
+Spilling Counter
+
+This module contains the bounded-memory counter used by 'word_count.py'
+for inputs with more distinct words than fit in memory. Counts are kept in
+memory until they reach a memory budget, then spilled to disk as runs
+sorted by word and merged back with k-way merges of at most MERGE_FAN_IN
+runs at a time, managed by 'run_files.py'
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import heapq
+import sys
+from collections import Counter
+from itertools import islice
+from operator import itemgetter
+
+from run_files import RunFiles
+
+ENTRY_OVERHEAD = 100
+SPILL_OVERHEAD = 100
+SAMPLED_KEYS = 256
+
+
+class SpillingCounter:
+    """
+    Class to count words with bounded memory. Every entry is a tuple of
+    (word, count, position), where the position orders the words by their
+    first appearance across the whole input
+    """
+
+    def __init__(self, memory_budget=64 * 1_048_576, read_size=65_536):
+        """
+        Initializes the SpillingCounter object
+
+        Args:
+            memory_budget (int): Approximate bytes the in-memory counts may
+            take before they are spilled to disk
+            read_size (int): Largest number of bytes read at once from each
+            run
+
+        Returns:
+            None
+        """
+        self.memory_budget = memory_budget
+        self.read_size = read_size
+        self.total = 0
+        self._counts = Counter()
+        self._next_position = 0
+        self._runs = []
+        self._run_files = RunFiles('words_spill_', '.txt')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, words):
+        """
+        This function counts a batch of words, spilling the in-memory counts
+        when they exceed the memory budget
+
+        Args:
+            words (iterable): The words to be counted
+
+        Returns:
+            None
+        """
+        self._counts.update(words)
+        if self.memory_estimate() > self.memory_budget:
+            self._spill()
+
+    def memory_estimate(self):
+        """
+        This function estimates the bytes taken by the in-memory counts,
+        from the size of the table and the average size of a sample of keys.
+        The estimate includes the entries built when the counts are spilled
+
+        Returns:
+            int: The estimated bytes
+        """
+        if not self._counts:
+            return 0
+        sample = list(islice(self._counts, SAMPLED_KEYS))
+        key_size = sum(sys.getsizeof(word) for word in sample) / len(sample)
+        return sys.getsizeof(self._counts) + len(self._counts) * (
+            key_size + ENTRY_OVERHEAD + SPILL_OVERHEAD)
+
+    @property
+    def spills(self):
+        """
+        This function returns the number of run files written so far
+
+        Returns:
+            int: The spilled and merged runs
+        """
+        return self._run_files.created
+
+    def entries_per_run(self):
+        """
+        This function returns how many entries are sorted in memory at once
+        by 'external_sort', leaving room for the entries read back from
+        disk and the sort keys built for them
+
+        Returns:
+            int: The number of entries sorted in memory at once
+        """
+        return max(1024, int(self.memory_budget // (4 * ENTRY_OVERHEAD)))
+
+    def _write_run(self, entries):
+        """
+        This function writes sorted entries to a run file
+
+        Args:
+            entries (iterable): Tuples of (word, count, position)
+
+        Returns:
+            str: Path of the run file
+        """
+        run_path = self._run_files.new_path()
+        with open(run_path, 'w', encoding='utf-8', newline='') as run_file:
+            run_file.writelines(f'{count}\t{position}\t{word}\n'
+                                for word, count, position in entries)
+        return run_path
+
+    def _read_run(self, run_path, buffer_size):
+        """
+        This function lazily yields the entries of a run file
+
+        Args:
+            run_path (str): Path of the run file
+            buffer_size (int): Number of bytes read at once
+
+        Returns:
+            generator: Tuples of (word, count, position)
+        """
+        with open(run_path, 'r', encoding='utf-8', newline='\n',
+                  buffering=buffer_size) as run_file:
+            for line in run_file:
+                count, position, word = line[:-1].split('\t', 2)
+                yield word, int(count), int(position)
+
+    def _memory_entries(self):
+        """
+        This function lists the in-memory counts as entries, numbering the
+        words after every word counted before the last spill. Words counted
+        as UTF-8 bytes are decoded here, once each
+
+        Returns:
+            list: Tuples of (word, count, position) in order of first
+            appearance
+        """
+        start = self._next_position
+        return [(word.decode('utf-8') if isinstance(word, bytes) else word, count,
+                 start + index)
+                for index, (word, count) in enumerate(self._counts.items())]
+
+    def _merge_runs(self, runs, key):
+        """
+        This function k-way merges sorted run files. The read buffers of all
+        the runs together take at most a quarter of the memory budget
+
+        Args:
+            runs (list): Paths of at most MERGE_FAN_IN run files
+            key (callable): The sort key the runs are sorted by
+
+        Returns:
+            iterable: The entries of every run in sorted order
+        """
+        buffer_size = min(self.read_size, max(4096, self.memory_budget // (4 * len(runs))))
+        return heapq.merge(*(self._read_run(run, buffer_size) for run in runs), key=key)
+
+    def _compact_runs(self, runs, key):
+        """
+        This function merges sorted run files, writing every merged group
+        back as a new run, until the remaining runs can be merged at once
+
+        Args:
+            runs (list): Paths of the run files
+            key (callable): The sort key the runs are sorted by
+
+        Returns:
+            list: Paths of at most MERGE_FAN_IN run files
+        """
+        return self._run_files.compact(
+            runs, lambda group: self._write_run(self._merge_runs(group, key)))
+
+    def _spill(self):
+        """
+        This function writes the in-memory counts to disk as a run sorted
+        by word
+
+        Returns:
+            None
+        """
+        entries = self._memory_entries()
+        self.total += sum(self._counts.values())
+        self._next_position += len(entries)
+        entries.sort(key=itemgetter(0))
+        self._runs.append(self._write_run(entries))
+        self._counts = Counter()
+
+    def iter_merged(self):
+        """
+        This function yields the count of every word in word order, merging
+        the runs on disk with the in-memory counts. A word counted in several
+        runs keeps the position of its first appearance
+
+        Returns:
+            generator: Tuples of (word, count, position)
+        """
+        if not self._runs:
+            yield from sorted(self._memory_entries(), key=itemgetter(0))
+            return
+        if self._counts:
+            self._spill()
+
+        self._runs = self._compact_runs(self._runs, itemgetter(0))
+        merged = self._merge_runs(self._runs, itemgetter(0))
+        first = next(merged, None)
+        if first is None:
+            return
+        current_word, current_count, current_position = first
+        for word, count, position in merged:
+            if word == current_word:
+                current_count += count
+                current_position = min(current_position, position)
+                continue
+            yield current_word, current_count, current_position
+            current_word, current_count, current_position = word, count, position
+        yield current_word, current_count, current_position
+
+    def counted_words(self):
+        """
+        This function returns the number of words counted so far
+
+        Returns:
+            int: The total of every count
+        """
+        return self.total + sum(self._counts.values())
+
+    def external_sort(self, entries, key):
+        """
+        This function sorts entries that may not fit in memory, writing
+        sorted runs of 'entries_per_run' entries and merging them back
+
+        Args:
+            entries (iterable): Tuples of (word, count, position)
+            key (callable): The sort key of an entry
+
+        Returns:
+            iterable: The entries in sorted order
+        """
+        entries = iter(entries)
+        chunk_size = self.entries_per_run()
+        runs = []
+        while True:
+            chunk = sorted(islice(entries, chunk_size), key=key)
+            if len(chunk) < chunk_size and not runs:
+                return chunk
+            if not chunk:
+                break
+            runs.append(self._write_run(chunk))
+        return self._merge_runs(self._compact_runs(runs, key), key)
+
+    def close(self):
+        """
+        This function removes the temporary run files
+
+        Returns:
+            None
+        """
+        self._run_files.close()
+        self._runs = []
@@ -0,0 +1,117 @@
+"""
+State Snapshot
+
+This module contains the snapshots used by the incremental mode of
+'compute_statistics.py'. A snapshot records how far an append-only input
+file has been read together with the aggregates of that prefix, so a
+later run only has to fold in the lines appended since then. Only bounded
+aggregates are kept: the moments, and the KLL and Space-Saving sketches of
+the order statistics when they were requested, so the size of a snapshot
+does not depend on the input
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import hashlib
+import json
+import os
+
+from streaming_statistics import PartialStatistics
+
+SNAPSHOT_VERSION = 4
+FINGERPRINT_SIZE = 4096
+
+
+def snapshot_path(file_path):
+    """
+    This function returns the path of the snapshot kept next to an input
+
+    Args:
+        file_path (str): Path of the TXT input file
+
+    Returns:
+        str: Path of the snapshot file
+    """
+    return f'{file_path}.stats-state.json'
+
+
+def fingerprint(file, offset):
+    """
+    This function hashes the first bytes of a file and the bytes right
+    before an offset, to detect whether the already-read prefix changed
+
+    Args:
+        file (file): The input file, opened in binary mode
+        offset (int): End of the already-read prefix
+
+    Returns:
+        str: Hexadecimal digest of both pieces
+    """
+    digest = hashlib.sha256()
+    file.seek(0)
+    digest.update(file.read(min(offset, FINGERPRINT_SIZE)))
+    tail_start = max(0, offset - FINGERPRINT_SIZE)
+    file.seek(tail_start)
+    digest.update(file.read(offset - tail_start))
+    return digest.hexdigest()
+
+
+def load_snapshot(file_path):
+    """
+    This function loads the snapshot of an input if it is still valid.
+    A snapshot is discarded when its version is unknown, it cannot be read,
+    or the input was truncated or rewritten since it was taken
+
+    Args:
+        file_path (str): Path of the TXT input file
+
+    Returns:
+        tuple|None: The (offset, PartialStatistics) of the snapshot, or
+        None if the input has to be read from the start
+    """
+    try:
+        with open(snapshot_path(file_path), 'r', encoding='utf-8') as file:
+            snapshot = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        print('Ignoring snapshot with an unknown version')
+        return None
+
+    offset = snapshot['offset']
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size < offset:
+            print('Input was truncated, recomputing from the start')
+            return None
+        if fingerprint(file, offset) != snapshot['fingerprint']:
+            print('Input was rewritten, recomputing from the start')
+            return None
+    return offset, PartialStatistics.from_dict(snapshot['state'])
+
+
+def save_snapshot(file_path, offset, totals):
+    """
+    This function saves the snapshot of an input, replacing the previous
+    one atomically
+
+    Args:
+        file_path (str): Path of the TXT input file
+        offset (int): End of the prefix the aggregates cover
+        totals (PartialStatistics): The aggregates of that prefix
+
+    Returns:
+        None
+    """
+    with open(file_path, 'rb') as file:
+        digest = fingerprint(file, offset)
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'offset': offset,
+        'fingerprint': digest,
+        'state': totals.to_dict(),
+    }
+    temporary_path = f'{snapshot_path(file_path)}.tmp'
+    with open(temporary_path, 'w', encoding='utf-8') as file:
+        json.dump(snapshot, file)
+    os.replace(temporary_path, snapshot_path(file_path))
@@ -0,0 +1,316 @@
+"""
+Statistics Pipeline
+
+This module contains the fused statistics pipeline used by
+'compute_statistics.py'. Every metric is derived from a shared
+intermediate state that is computed at most once and only when one of
+the requested metrics needs it
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import operator
+from functools import cached_property, reduce
+
+from frequency_index import FrequencyIndex, format_mode
+from order_statistics import histogram, percentile_position, value_at_rank
+from streaming_statistics import PowerSums
+
+METRIC_LABELS = {
+    'mean': 'Mean',
+    'median': 'Median',
+    'mode': 'Mode',
+    'variance': 'Variance',
+    'stddev': 'Standard Deviation',
+    'min': 'Minimum',
+    'max': 'Maximum',
+    'p90': '90th Percentile',
+    'p95': '95th Percentile',
+    'p99': '99th Percentile',
+    'skewness': 'Skewness',
+    'kurtosis': 'Excess Kurtosis',
+    'histogram': 'Histogram',
+}
+DEFAULT_METRICS = ('mean', 'median', 'mode', 'variance', 'stddev')
+PERCENTILES = {'p90': 90, 'p95': 95, 'p99': 99}
+ORDER_METRICS = frozenset({'median', 'mode', 'histogram', *PERCENTILES})
+POWER_SUM_METRICS = frozenset({'min', 'max', 'skewness', 'kurtosis', 'histogram'})
+HISTOGRAM_BINS = 10
+
+
+def integral(value):
+    """
+    This function returns a number as an integer when it has no
+    fractional part
+
+    Args:
+        value (float): The number to be simplified
+
+    Returns:
+        int|float: The number as an integer if it is integral, otherwise
+        the number unchanged
+    """
+    return int(value) if value == int(value) else value
+
+
+def parse_metrics(metrics):
+    """
+    This function validates a comma-separated list of metric names
+
+    Args:
+        metrics (str): Metric names separated by commas, 'default' for the
+        mean, median, mode, variance and standard deviation, or 'all'
+
+    Returns:
+        tuple: The requested metrics in report order
+
+    Raises:
+        ValueError: If a metric name is not known
+    """
+    if metrics == 'default':
+        return DEFAULT_METRICS
+    if metrics == 'all':
+        return tuple(METRIC_LABELS)
+    requested = {name.strip() for name in metrics.split(',') if name.strip()}
+    unknown = requested - set(METRIC_LABELS)
+    if unknown:
+        raise ValueError(f'Unknown metrics: {", ".join(sorted(unknown))}')
+    return tuple(name for name in METRIC_LABELS if name in requested)
+
+
+def parse_range(value_range):
+    """
+    This function validates the bounds of the histogram
+
+    Args:
+        value_range (str): The lower and upper bounds separated by a comma
+
+    Returns:
+        tuple: The (low, high) bounds
+
+    Raises:
+        ValueError: If the bounds are not two numbers in increasing order
+    """
+    bounds = tuple(float(bound) for bound in value_range.split(','))
+    if len(bounds) != 2 or not bounds[0] < bounds[1]:
+        raise ValueError('The histogram range must be LOW,HIGH with LOW < HIGH')
+    return bounds
+
+
+def format_statistic(value):
+    """
+    This function formats a statistic the way it is reported in
+    'StatisticsResults.txt'. A histogram is written as its bins separated
+    by semicolons, and every other statistic as it is
+
+    Args:
+        value (int|float|str|list): The statistic
+
+    Returns:
+        int|float|str: The statistic to be reported
+    """
+    if not isinstance(value, list):
+        return value
+    last = len(value) - 1
+    return '; '.join(f'[{low:g}, {high:g}{"]" if index == last else ")"}: {count}'
+                     for index, (low, high, count) in enumerate(value))
+
+
+class StatisticsState:
+    """
+    Class to hold the intermediate results shared by the statistics of a
+    list of numbers. Each intermediate result is computed lazily, so the
+    number of passes over the data depends only on the requested metrics:
+    one for the sum, one for the squared deviations, one for the power
+    sums and one for the frequency index, whose sorted values are shared by
+    the median, the percentiles and the histogram
+    """
+
+    def __init__(self, num_list, histogram_bins=HISTOGRAM_BINS, histogram_range=None):
+        """
+        Initializes the StatisticsState object
+
+        Args:
+            num_list (list): The list of numbers
+            histogram_bins (int): Number of bins of the histogram
+            histogram_range (tuple): Optional (low, high) bounds of the
+            histogram. Defaults to the smallest and largest numbers
+
+        Returns:
+            None
+        """
+        self.num_list = num_list
+        self.count = len(num_list)
+        self.histogram_bins = histogram_bins
+        self.histogram_range = histogram_range
+
+    def compute(self, metrics, instrumentation=None):
+        """
+        This function computes the requested metrics
+
+        Args:
+            metrics (iterable): Names of the metrics to compute
+            instrumentation (Instrumentation): Times every metric as its own
+            span when given
+
+        Returns:
+            dict: The statistics, keyed by their report label
+        """
+        if instrumentation is None or not instrumentation.enabled:
+            return {METRIC_LABELS[name]: getattr(self, name) for name in metrics}
+        statistics = {}
+        for name in metrics:
+            with instrumentation.span(name):
+                statistics[METRIC_LABELS[name]] = getattr(self, name)
+        return statistics
+
+    def sum_values(self):
+        """
+        This function adds the numbers from left to right
+
+        Returns:
+            float: The sum of the numbers
+        """
+        return reduce(operator.add, self.num_list, 0)
+
+    def sum_squared_deviations(self, mean_val):
+        """
+        This function adds the squared deviations of the numbers from
+        their mean, from left to right
+
+        Args:
+            mean_val (int|float): The mean of the numbers
+
+        Returns:
+            float: The sum of the squared deviations
+        """
+        return reduce(operator.add, ((x - mean_val) ** 2 for x in self.num_list), 0)
+
+    def percentile(self, percent):
+        """
+        This function returns a percentile of the numbers, interpolating
+        linearly between the two closest ranks
+
+        Args:
+            percent (int|float): The percentile to compute, from 0 to 100
+
+        Returns:
+            float: The value below which the given percent of the numbers falls
+        """
+        lower_index, upper_index, fraction = percentile_position(self.count, percent)
+        lower = value_at_rank(self.sorted_items, lower_index)
+        return lower + (value_at_rank(self.sorted_items, upper_index) - lower) * fraction
+
+    @cached_property
+    def frequencies(self):
+        """
+        FrequencyIndex: The frequency of each distinct number
+        """
+        return FrequencyIndex(self.num_list)
+
+    @cached_property
+    def sorted_items(self):
+        """
+        list: Tuples of (number, frequency) in ascending order
+        """
+        return self.frequencies.sorted_items()
+
+    @cached_property
+    def power_sums(self):
+        """
+        PowerSums: The power sums of the deviations of the numbers
+        """
+        return PowerSums.from_values(self.num_list)
+
+    @cached_property
+    def mean(self):
+        """
+        int|float: The mean of the numbers
+        """
+        return integral(self.sum_values() / self.count)
+
+    @cached_property
+    def median(self):
+        """
+        int|float: The median of the numbers
+        """
+        return self.frequencies.median(self.sorted_items)
+
+    @cached_property
+    def mode(self):
+        """
+        int|float|str: The mode of the numbers
+        """
+        return format_mode(self.frequencies)
+
+    @cached_property
+    def variance(self):
+        """
+        float: The variance of the numbers
+        """
+        return self.sum_squared_deviations(self.mean) / self.count
+
+    @cached_property
+    def stddev(self):
+        """
+        float: The standard deviation of the numbers
+        """
+        return self.variance ** 0.5
+
+    @cached_property
+    def min(self):
+        """
+        int|float: The smallest number
+        """
+        return min(self.num_list)
+
+    @cached_property
+    def max(self):
+        """
+        int|float: The largest number
+        """
+        return max(self.num_list)
+
+    @cached_property
+    def p90(self):
+        """
+        float: The 90th percentile of the numbers
+        """
+        return self.percentile(PERCENTILES['p90'])
+
+    @cached_property
+    def p95(self):
+        """
+        float: The 95th percentile of the numbers
+        """
+        return self.percentile(PERCENTILES['p95'])
+
+    @cached_property
+    def p99(self):
+        """
+        float: The 99th percentile of the numbers
+        """
+        return self.percentile(PERCENTILES['p99'])
+
+    @cached_property
+    def skewness(self):
+        """
+        float|str: The skewness of the numbers, or 'N/A' if they are all equal
+        """
+        return self.power_sums.skewness()
+
+    @cached_property
+    def kurtosis(self):
+        """
+        float|str: The excess kurtosis of the numbers, or 'N/A' if they are
+        all equal
+        """
+        return self.power_sums.kurtosis()
+
+    @cached_property
+    def histogram(self):
+        """
+        list: Tuples of (lower edge, upper edge, count) of the histogram
+        """
+        low, high = self.histogram_range or (self.min, self.max)
+        return histogram(self.sorted_items, self.histogram_bins, low, high)
@@ -0,0 +1,677 @@
+"""
+Streaming Statistics
+
+This module contains the constant-memory building blocks used by the
+streaming, parallel and approximate modes of 'compute_statistics.py':
+running moments updated one value at a time, power sums for the higher
+moments, mergeable aggregates of a piece of the input and a spill-to-disk
+sorter for the order statistics
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import heapq
+import operator
+from array import array
+from functools import reduce
+from itertools import repeat
+
+from frequency_index import FrequencyIndex, format_mode
+from order_statistics import percentile_position
+from run_files import MERGE_FAN_IN, RunFiles
+from sketches import KLLSketch, SpaceSaving
+
+
+class RunningMoments:
+    """
+    Class to keep the count, mean and variance of a stream of numbers
+    using Welford's single-pass update
+    """
+
+    def __init__(self):
+        """
+        Initializes the RunningMoments object
+
+        Returns:
+            None
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        This function builds the moments of a batch of values already in
+        memory with an exact two-pass computation
+
+        Args:
+            values (list): The values of the batch
+
+        Returns:
+            RunningMoments: The moments of the batch
+        """
+        moments = cls()
+        if values:
+            moments.count = len(values)
+            moments.mean = reduce(operator.add, values, 0) / moments.count
+            moments.m2 = reduce(operator.add, ((x - moments.mean) ** 2 for x in values), 0)
+        return moments
+
+    def push(self, value):
+        """
+        This function folds a single value into the running moments
+
+        Args:
+            value (float): The value to be added
+
+        Returns:
+            None
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """
+        This function combines the moments of another stream into this one
+        using Chan's parallel update
+
+        Args:
+            other (RunningMoments): The moments to be merged
+
+        Returns:
+            RunningMoments: This object, after the merge
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        return self
+
+    def variance(self):
+        """
+        This function returns the population variance of the stream
+
+        Returns:
+            float: The variance of the values pushed so far
+        """
+        return self.m2 / self.count
+
+    def stddev(self):
+        """
+        This function returns the population standard deviation of the stream
+
+        Returns:
+            float: The standard deviation of the values pushed so far
+        """
+        return self.variance() ** 0.5
+
+
+class PowerSums:
+    """
+    Class to keep the smallest and largest values of a stream and the sums
+    of the first four powers of their deviations from a shift, from which
+    the central moments up to the fourth are derived. The shift is the
+    first value seen, which keeps the sums small for values far from zero
+    """
+
+    block_size = 65_536
+
+    def __init__(self):
+        """
+        Initializes the PowerSums object
+
+        Returns:
+            None
+        """
+        self.count = 0
+        self.shift = 0.0
+        self.sums = [0.0, 0.0, 0.0, 0.0]
+        self.minimum = None
+        self.maximum = None
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        This function builds the power sums of a batch of values already in
+        memory, adding every power from left to right block by block
+
+        Args:
+            values (list|array): The values of the batch
+
+        Returns:
+            PowerSums: The power sums of the batch
+        """
+        power_sums = cls()
+        if not values:
+            return power_sums
+        power_sums.count = len(values)
+        power_sums.shift = shift = values[0]
+        power_sums.minimum = min(values)
+        power_sums.maximum = max(values)
+        sums = power_sums.sums
+        for start in range(0, len(values), cls.block_size):
+            block = values[start:start + cls.block_size]
+            deviations = list(map(operator.sub, block, repeat(shift)))
+            squares = list(map(operator.mul, deviations, deviations))
+            sums[0] = reduce(operator.add, deviations, sums[0])
+            sums[1] = reduce(operator.add, squares, sums[1])
+            sums[2] = reduce(operator.add, map(operator.mul, squares, deviations), sums[2])
+            sums[3] = reduce(operator.add, map(operator.mul, squares, squares), sums[3])
+        return power_sums
+
+    def push(self, value):
+        """
+        This function folds a single value into the power sums
+
+        Args:
+            value (float): The value to be added
+
+        Returns:
+            None
+        """
+        if self.count == 0:
+            self.shift = self.minimum = self.maximum = value
+        elif value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+        self.count += 1
+        deviation = value - self.shift
+        square = deviation * deviation
+        sums = self.sums
+        sums[0] += deviation
+        sums[1] += square
+        sums[2] += square * deviation
+        sums[3] += square * square
+
+    def shifted_sums(self, shift):
+        """
+        This function expresses the power sums around another shift with
+        the binomial expansion of every power
+
+        Args:
+            shift (float): The new shift
+
+        Returns:
+            list: The sums of the first four powers of the deviations from
+            the new shift
+        """
+        delta = self.shift - shift
+        count = self.count
+        sum_1, sum_2, sum_3, sum_4 = self.sums
+        return [sum_1 + delta * count,
+                sum_2 + 2 * delta * sum_1 + delta ** 2 * count,
+                sum_3 + 3 * delta * sum_2 + 3 * delta ** 2 * sum_1 + delta ** 3 * count,
+                sum_4 + 4 * delta * sum_3 + 6 * delta ** 2 * sum_2
+                + 4 * delta ** 3 * sum_1 + delta ** 4 * count]
+
+    def merge(self, other):
+        """
+        This function combines the power sums of another stream into this
+        one, moving them to this object's shift first
+
+        Args:
+            other (PowerSums): The power sums to be merged
+
+        Returns:
+            PowerSums: This object, after the merge
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.shift, self.sums = other.count, other.shift, list(other.sums)
+            self.minimum, self.maximum = other.minimum, other.maximum
+            return self
+        self.sums = [own + moved for own, moved in zip(self.sums, other.shifted_sums(self.shift))]
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    def central_moments(self):
+        """
+        This function returns the second, third and fourth central moments
+        of the stream
+
+        Returns:
+            tuple: The three central moments
+        """
+        count = self.count
+        mean = self.sums[0] / count
+        raw_2, raw_3, raw_4 = (power_sum / count for power_sum in self.sums[1:])
+        moment_2 = raw_2 - mean ** 2
+        moment_3 = raw_3 - 3 * mean * raw_2 + 2 * mean ** 3
+        moment_4 = raw_4 - 4 * mean * raw_3 + 6 * mean ** 2 * raw_2 - 3 * mean ** 4
+        return moment_2, moment_3, moment_4
+
+    def skewness(self):
+        """
+        This function returns the population skewness of the stream
+
+        Returns:
+            float|str: The skewness, or 'N/A' if every value is the same
+        """
+        moment_2, moment_3, _ = self.central_moments()
+        return moment_3 / moment_2 ** 1.5 if moment_2 > 0 else 'N/A'
+
+    def kurtosis(self):
+        """
+        This function returns the population excess kurtosis of the stream,
+        which is 0 for a normal distribution
+
+        Returns:
+            float|str: The excess kurtosis, or 'N/A' if every value is the
+            same
+        """
+        moment_2, _, moment_4 = self.central_moments()
+        return moment_4 / moment_2 ** 2 - 3 if moment_2 > 0 else 'N/A'
+
+    def metrics(self):
+        """
+        This function lists the metrics answered by the power sums
+
+        Returns:
+            dict: Functions returning each metric, keyed by the metric name
+        """
+        return {
+            'min': lambda: self.minimum,
+            'max': lambda: self.maximum,
+            'skewness': self.skewness,
+            'kurtosis': self.kurtosis,
+        }
+
+    def to_list(self):
+        """
+        This function converts the power sums into JSON-serializable values
+
+        Returns:
+            list: The count, shift, four sums, minimum and maximum
+        """
+        return [self.count, self.shift, *self.sums, self.minimum, self.maximum]
+
+    @classmethod
+    def from_list(cls, state):
+        """
+        This function rebuilds the power sums saved by 'to_list'
+
+        Args:
+            state (list): The saved power sums
+
+        Returns:
+            PowerSums: The rebuilt power sums
+        """
+        power_sums = cls()
+        power_sums.count, power_sums.shift = state[0], state[1]
+        power_sums.sums = list(state[2:6])
+        power_sums.minimum, power_sums.maximum = state[6], state[7]
+        return power_sums
+
+
+class PartialStatistics:
+    """
+    Class to hold the mergeable aggregates of one piece of the input, so
+    pieces parsed separately can be combined into the totals of the file.
+    The order statistics come either from an exact frequency table or, in
+    approximate mode, from bounded-memory sketches
+    """
+
+    def __init__(self, quantile_error=None, mode_error=None):
+        """
+        Initializes the PartialStatistics object
+
+        Args:
+            quantile_error (float): Accepted rank error of the quantiles.
+            When given, a KLL sketch replaces the exact frequency table
+            mode_error (float): Accepted overcount of the mode, as a
+            fraction of the values. When given, a Space-Saving summary
+            replaces the exact frequency table
+
+        Returns:
+            None
+        """
+        self.lines = 0
+        self.total = 0
+        self.moments = RunningMoments()
+        self.power_sums = PowerSums()
+        self.frequencies = FrequencyIndex()
+        self.quantiles = None if quantile_error is None else KLLSketch.for_error(quantile_error)
+        self.heavy_hitters = None if mode_error is None else SpaceSaving.for_error(mode_error)
+
+    @property
+    def rejected(self):
+        """
+        This function returns the number of lines that were not numbers
+
+        Returns:
+            int: The lines folded in without a value
+        """
+        return self.lines - self.moments.count
+
+    def add_values(self, values, lines, with_frequencies=True, with_power_sums=False):
+        """
+        This function folds a batch of parsed values into the aggregates
+
+        Args:
+            values (list): The values parsed from the batch
+            lines (int): Number of lines the batch was parsed from
+            with_frequencies (bool): Whether to count the frequency of
+            each value
+            with_power_sums (bool): Whether to add the values to the power
+            sums, which are otherwise left behind the other aggregates
+
+        Returns:
+            PartialStatistics: This object, after the update
+        """
+        self.lines += lines
+        self.total = reduce(operator.add, values, self.total)
+        self.moments.merge(RunningMoments.from_values(values))
+        if with_power_sums:
+            self.power_sums.merge(PowerSums.from_values(values))
+        if self.quantiles is not None:
+            self.quantiles.update_many(values)
+        if self.heavy_hitters is not None:
+            self.heavy_hitters.update_many(values)
+        elif with_frequencies:
+            self.frequencies.update(values)
+        return self
+
+    def merge(self, other):
+        """
+        This function combines the aggregates of the next piece of the
+        input into this one
+
+        Args:
+            other (PartialStatistics): The aggregates to be merged
+
+        Returns:
+            PartialStatistics: This object, after the merge
+        """
+        self.lines += other.lines
+        self.total += other.total
+        self.moments.merge(other.moments)
+        self.power_sums.merge(other.power_sums)
+        self.frequencies.merge(other.frequencies)
+        if self.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        if self.heavy_hitters is not None:
+            self.heavy_hitters.merge(other.heavy_hitters)
+        return self
+
+    def to_dict(self):
+        """
+        This function converts the bounded aggregates into JSON-serializable
+        values. The exact frequency table is left out, since its size grows
+        with the number of distinct values
+
+        Returns:
+            dict: The aggregates
+        """
+        return {
+            'lines': self.lines,
+            'total': self.total,
+            'moments': [self.moments.count, self.moments.mean, self.moments.m2],
+            'power_sums': self.power_sums.to_list(),
+            'quantiles': None if self.quantiles is None else self.quantiles.to_dict(),
+            'heavy_hitters': (None if self.heavy_hitters is None
+                              else self.heavy_hitters.to_dict()),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """
+        This function rebuilds the aggregates saved by 'to_dict'
+
+        Args:
+            state (dict): The saved aggregates
+
+        Returns:
+            PartialStatistics: The rebuilt aggregates
+        """
+        partial = cls()
+        partial.lines = state['lines']
+        partial.total = state['total']
+        partial.moments.count, partial.moments.mean, partial.moments.m2 = state['moments']
+        partial.power_sums = PowerSums.from_list(state['power_sums'])
+        if state.get('quantiles') is not None:
+            partial.quantiles = KLLSketch.from_dict(state['quantiles'])
+        if state.get('heavy_hitters') is not None:
+            partial.heavy_hitters = SpaceSaving.from_dict(state['heavy_hitters'])
+        return partial
+
+
+class SpillingSorter:
+    """
+    Class to sort a stream of numbers with bounded memory by spilling
+    sorted runs to temporary files and merging them back, at most
+    MERGE_FAN_IN runs at a time
+    """
+
+    def __init__(self, max_in_memory=1_000_000, read_size=65_536):
+        """
+        Initializes the SpillingSorter object
+
+        Args:
+            max_in_memory (int): Number of values kept in memory before a
+            sorted run is written to disk
+            read_size (int): Number of values read at once from each run
+
+        Returns:
+            None
+        """
+        self.max_in_memory = max_in_memory
+        self.read_size = read_size
+        self.count = 0
+        self._buffer = array('d')
+        self._runs = []
+        self._run_files = RunFiles('stats_spill_', '.bin')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def push(self, value):
+        """
+        This function adds a value to the sorter, spilling the in-memory
+        buffer when it is full
+
+        Args:
+            value (float): The value to be added
+
+        Returns:
+            None
+        """
+        self._buffer.append(value)
+        self.count += 1
+        if len(self._buffer) >= self.max_in_memory:
+            self._spill()
+
+    def _spill(self):
+        """
+        This function writes the in-memory buffer to disk as a sorted run
+
+        Returns:
+            None
+        """
+        run_path = self._run_files.new_path()
+        with open(run_path, 'wb') as run_file:
+            array('d', sorted(self._buffer)).tofile(run_file)
+        self._runs.append(run_path)
+        self._buffer = array('d')
+
+    def _merge_group(self, runs):
+        """
+        This function merges sorted runs into a single new run
+
+        Args:
+            runs (list): Paths of the run files
+
+        Returns:
+            str: Path of the merged run file
+        """
+        run_path = self._run_files.new_path()
+        with open(run_path, 'wb') as run_file:
+            chunk = array('d')
+            for value in heapq.merge(*(self._read_run(run) for run in runs)):
+                chunk.append(value)
+                if len(chunk) >= self.read_size:
+                    chunk.tofile(run_file)
+                    chunk = array('d')
+            chunk.tofile(run_file)
+        return run_path
+
+    def _compact_runs(self):
+        """
+        This function merges the runs in passes of at most MERGE_FAN_IN
+        runs until they can be merged together with the in-memory buffer
+
+        Returns:
+            None
+        """
+        self._runs = self._run_files.compact(self._runs, self._merge_group, MERGE_FAN_IN - 1)
+
+    def _read_run(self, run_path):
+        """
+        This function lazily yields the values of a sorted run
+
+        Args:
+            run_path (str): Path of the run file
+
+        Returns:
+            generator: The values of the run in ascending order
+        """
+        with open(run_path, 'rb') as run_file:
+            while True:
+                chunk = array('d')
+                try:
+                    chunk.fromfile(run_file, self.read_size)
+                except EOFError:
+                    yield from chunk
+                    return
+                yield from chunk
+
+    def iter_sorted(self):
+        """
+        This function yields every value pushed so far in ascending order
+
+        Returns:
+            generator: The values in ascending order
+        """
+        in_memory = sorted(self._buffer)
+        if not self._runs:
+            yield from in_memory
+            return
+        self._compact_runs()
+        yield from heapq.merge(in_memory, *(self._read_run(run) for run in self._runs))
+
+    def iter_runs(self):
+        """
+        This function yields each distinct value together with the number
+        of times it appears, in ascending order
+
+        Returns:
+            generator: Tuples of (value, frequency)
+        """
+        current = None
+        frequency = 0
+        for value in self.iter_sorted():
+            if frequency and value == current:
+                frequency += 1
+                continue
+            if frequency:
+                yield current, frequency
+            current, frequency = value, 1
+        if frequency:
+            yield current, frequency
+
+    def median(self):
+        """
+        This function returns the median of the values pushed so far
+
+        Returns:
+            float: The median of the values
+        """
+        mid_index_1 = self.count // 2
+        mid_index_2 = (self.count - 1) // 2
+        lower = upper = None
+        for index, value in enumerate(self.iter_sorted()):
+            if index == mid_index_2:
+                lower = value
+            if index == mid_index_1:
+                upper = value
+                break
+        return (upper + lower) / 2 if self.count % 2 == 0 else upper
+
+    def percentile(self, percent):
+        """
+        This function returns a percentile of the values pushed so far,
+        interpolating linearly between the two closest ranks
+
+        Args:
+            percent (int|float): The percentile to compute, from 0 to 100
+
+        Returns:
+            float: The value below which the given percent of the data falls
+        """
+        lower_index, upper_index, fraction = percentile_position(self.count, percent)
+        lower = None
+        for index, value in enumerate(self.iter_sorted()):
+            if index == lower_index:
+                lower = value
+            if index == upper_index:
+                return lower + (value - lower) * fraction
+        raise IndexError('percentile of an empty sorter')
+
+    def all_tied(self):
+        """
+        This function checks whether every distinct value pushed so far
+        appears the same number of times
+
+        Returns:
+            bool: True if all the frequencies are equal
+        """
+        frequencies = (frequency for _, frequency in self.iter_runs())
+        first = next(frequencies, None)
+        return all(frequency == first for frequency in frequencies)
+
+    def modes(self):
+        """
+        This function returns every value with the highest frequency, in
+        two passes over the sorted runs so memory does not grow with the
+        number of distinct values
+
+        Returns:
+            list: The most frequent values in ascending order
+        """
+        max_freq = max((frequency for _, frequency in self.iter_runs()), default=0)
+        return [value for value, frequency in self.iter_runs() if frequency == max_freq]
+
+    def mode(self):
+        """
+        This function returns the mode of the values pushed so far
+
+        Returns:
+            float|str: The single mode, the tied modes separated by commas,
+            or 'N/A' if every value has the same frequency
+        """
+        return format_mode(self)
+
+    def close(self):
+        """
+        This function removes the temporary run files
+
+        Returns:
+            None
+        """
+        self._run_files.close()
+        self._runs = []
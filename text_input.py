@@ -0,0 +1,178 @@
+"""
+Text Input
+
+This module contains the input layer shared by the three programs: a
+memory-mapped line scanner that counts lines with a newline scan and yields
+undecoded lines lazily, and a helper to split a file into byte ranges
+aligned on line boundaries
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import mmap
+import os
+
+BLOCK_SIZE = 1_048_576
+
+
+def split_byte_ranges(file_path, parts, min_size=1_048_576):
+    """
+    This function splits a file into byte ranges that start and end on
+    line boundaries, so every line belongs to exactly one range
+
+    Args:
+        file_path (str): Path of the file
+        parts (int): Desired number of ranges
+        min_size (int): Smallest range size worth splitting, in bytes
+
+    Returns:
+        list: Tuples of (start, end) byte offsets covering the whole file
+    """
+    file_size = os.path.getsize(file_path)
+    if file_size == 0:
+        return []
+    parts = max(1, min(parts, file_size // min_size or 1))
+    boundaries = [0]
+    with open(file_path, 'rb') as file:
+        for part in range(1, parts):
+            target = max(file_size * part // parts, boundaries[-1])
+            file.seek(target)
+            file.readline()
+            position = file.tell()
+            if position >= file_size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+class LineScanner:
+    """
+    Class to read the lines of a TXT file through a read-only memory map.
+    Lines are yielded as bytes without their line ending, with the same
+    line boundaries as reading the file in text mode, and are only decoded
+    by the caller when needed
+    """
+
+    def __init__(self, file_path, block_size=BLOCK_SIZE, release_pages=False):
+        """
+        Initializes the LineScanner object
+
+        Args:
+            file_path (str): Path of the TXT file
+            block_size (int): Approximate number of bytes split into lines
+            at once
+            release_pages (bool): Whether the mapped pages of every block are
+            released once it is read, so the resident memory does not grow
+            with the file size
+
+        Returns:
+            None
+        """
+        self.file_path = file_path
+        self.block_size = block_size
+        self.release_pages = release_pages and hasattr(mmap, 'MADV_DONTNEED')
+        self.size = 0
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        self._file = open(self.file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def count_lines(self, start=0, end=None):
+        """
+        This function counts the lines of the file, or of a byte range of
+        it, by scanning for newline bytes
+
+        Args:
+            start (int): Offset of the first byte to scan
+            end (int): Offset just past the last byte to scan. Defaults to
+            the end of the file
+
+        Returns:
+            int: Number of lines, counting a last line without a line ending
+        """
+        end = self.size if end is None else end
+        if start >= end:
+            return 0
+        total_count = 0
+        for block_start in range(start, end, self.block_size):
+            block_end = min(block_start + self.block_size, end)
+            block = self._map[block_start:block_end]
+            if b'\r' in block:
+                return sum(1 for _ in self.iter_lines(start, end))
+            total_count += block.count(b'\n')
+            self._release(block_start, block_end)
+        if self._map[end - 1:end] != b'\n':
+            total_count += 1
+        return total_count
+
+    def _release(self, start, end):
+        """
+        This function drops the mapped pages of a byte range from the
+        resident memory when 'release_pages' is set. They are read again
+        from the file if the range is accessed later
+
+        Args:
+            start (int): Offset of the first byte of the range
+            end (int): Offset just past the last byte of the range
+
+        Returns:
+            None
+        """
+        if self.release_pages:
+            page_start = start - start % mmap.PAGESIZE
+            self._map.madvise(mmap.MADV_DONTNEED, page_start, end - page_start)
+
+    def find_last_newline(self, start=0):
+        """
+        This function finds the last newline byte of the file
+
+        Args:
+            start (int): Offset where the search starts
+
+        Returns:
+            int: Offset of the last newline byte, or start - 1 if there is
+            none after start
+        """
+        position = self._map.rfind(b'\n', start)
+        return start - 1 if position == -1 else position
+
+    def iter_lines(self, start=0, end=None):
+        """
+        This function lazily yields the lines of the file, or of a byte range
+        of it that starts on a line boundary
+
+        Args:
+            start (int): Offset of the first byte to read
+            end (int): Offset just past the last byte to read. Defaults to
+            the end of the file
+
+        Returns:
+            generator: The lines as bytes, without their line ending
+        """
+        end = self.size if end is None else end
+        position = start
+        while position < end:
+            cut = self._map.find(b'\n', min(position + self.block_size, end) - 1, end)
+            block_end = end if cut == -1 else cut + 1
+            block = self._map[position:block_end]
+            self._release(position, block_end)
+            position = block_end
+            if b'\r' in block:
+                block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+            lines = block.split(b'\n')
+            if lines[-1] == b'':
+                lines.pop()
+            yield from lines
@@ -0,0 +1,153 @@
+"""
+Tokenizer
+
+This module contains the tokenizer used by 'word_count.py' to split the
+lines of a text into words. A line can be taken as a single word, split on
+whitespace, split with a regular expression, or split on Unicode word
+boundaries, with optional case folding and punctuation stripping
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+import re
+import string
+import sys
+import unicodedata
+from collections import Counter
+from functools import lru_cache, partial
+
+SPLIT_MODES = ('line', 'whitespace', 'regex', 'unicode')
+UNICODE_WORD = r"\w+(?:['’-]\w+)*"
+ASCII_PUNCTUATION = string.punctuation.encode('ascii')
+SEPARATORS = bytes.maketrans(b'\x1c\x1d\x1e\x1f', b'    ')
+FOLDED_SEPARATORS = bytes.maketrans(b'\x1c\x1d\x1e\x1f' + string.ascii_uppercase.encode('ascii'),
+                                    b'    ' + string.ascii_lowercase.encode('ascii'))
+
+
+@lru_cache(maxsize=None)
+def punctuation_characters():
+    """
+    This function collects the ASCII punctuation and every Unicode
+    character in a punctuation category. It is built once, on first use
+
+    Returns:
+        str: The punctuation characters, as accepted by str.strip
+    """
+    return ''.join({*string.punctuation,
+                    *(chr(code) for code in range(sys.maxunicode + 1)
+                      if unicodedata.category(chr(code)).startswith('P'))})
+
+
+def make_tokenizer(split='line', pattern=None, casefold=False, strip_punctuation=False):
+    """
+    This function validates the tokenizer settings and binds them to
+    'tokenize', or to 'split_whitespace' for the 'whitespace' mode. The
+    returned function can be sent to worker processes
+
+    Args:
+        split (str): How lines are split, one of 'line' (the whole stripped
+        line is a word), 'whitespace', 'regex' or 'unicode'
+        pattern (str): Regular expression matching a word, required by the
+        'regex' mode
+        casefold (bool): Whether words are case folded, so 'Word' and
+        'WORD' are counted together
+        strip_punctuation (bool): Whether punctuation is removed from both
+        ends of every word
+
+    Returns:
+        callable: Splits a line into its list of words
+
+    Raises:
+        ValueError: If the split mode or its pattern is not valid
+    """
+    if split not in SPLIT_MODES:
+        raise ValueError(f'Unknown split mode: {split}')
+    if split == 'regex' and not pattern:
+        raise ValueError("The 'regex' split mode needs a pattern")
+    punctuation = punctuation_characters() if strip_punctuation else ''
+    if split == 'whitespace':
+        return partial(split_whitespace, casefold, punctuation)
+    regex = re.compile(pattern if split == 'regex' else UNICODE_WORD) \
+        if split in ('regex', 'unicode') else None
+    return partial(tokenize, split, regex, casefold, punctuation)
+
+
+def tokenize(split, regex, casefold, punctuation, line):
+    """
+    This function splits a line into words. Every mode yields the tokens of
+    a line as a list, and a line without tokens yields an empty list. The
+    settings come first so 'make_tokenizer' can bind them
+
+    Args:
+        split (str): One of SPLIT_MODES
+        regex (re.Pattern): The pattern matching a word, for the 'regex'
+        and 'unicode' modes
+        casefold (bool): Whether the line is case folded
+        punctuation (str): Characters stripped from both ends of every word
+        line (str|bytes): The line, bytes are decoded as UTF-8
+
+    Returns:
+        list: The words of the line, in order
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8')
+    if casefold:
+        line = line.casefold()
+
+    if split == 'line':
+        words = [line.strip()]
+    elif split == 'whitespace':
+        words = line.split()
+    else:
+        words = regex.findall(line)
+
+    if punctuation:
+        words = [word.strip(punctuation) for word in words]
+    elif split == 'whitespace':
+        return words
+    return [word for word in words if word]
+
+
+def split_whitespace(casefold, punctuation, line):
+    """
+    This function splits a line on whitespace like 'tokenize', but a line
+    read as bytes is split without being decoded and yields its words as
+    UTF-8 bytes, so they are decoded once per distinct word by
+    'decode_words'. The ASCII separators that str.split also breaks on are
+    turned into spaces, and lines with non-ASCII bytes are decoded, so the
+    words always match those of the decoded line
+
+    Args:
+        casefold (bool): Whether the line is case folded
+        punctuation (str): Characters stripped from both ends of every word
+        line (str|bytes): The line
+
+    Returns:
+        list: The words of the line, in order, as bytes for a bytes line
+    """
+    if not isinstance(line, bytes):
+        return tokenize('whitespace', None, casefold, punctuation, line)
+    if not line.isascii():
+        return [word.encode('utf-8')
+                for word in tokenize('whitespace', None, casefold, punctuation, line)]
+    words = line.translate(FOLDED_SEPARATORS if casefold else SEPARATORS).split()
+    if punctuation:
+        words = [word.strip(ASCII_PUNCTUATION) for word in words]
+        return [word for word in words if word]
+    return words
+
+
+def decode_words(word_counts):
+    """
+    This function decodes the words of a Counter filled by
+    'split_whitespace', keeping their order of first appearance
+
+    Args:
+        word_counts (Counter): The count of each word, as str or bytes
+
+    Returns:
+        Counter: The count of each word as str
+    """
+    if not word_counts or isinstance(next(iter(word_counts)), str):
+        return word_counts
+    return Counter({word.decode('utf-8'): count for word, count in word_counts.items()})
@@ -7,8 +7,222 @@ prints the obtained count into a TXT output file
 Author:
     Julia Gabriela Pinedo (A01795315)
 """
-import sys
+import argparse
+import heapq
+import os
+import re
 import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from operator import itemgetter
+
+from instrumentation import Instrumentation
+from result_writer import ECHO_MODES, OutputOptions
+from spilling_counter import SpillingCounter
+from text_input import LineScanner, split_byte_ranges
+from tokenizer import SPLIT_MODES, decode_words, make_tokenizer
+
+TREE_MERGE_THRESHOLD = 8
+BATCH_LINES = 4096
+SORT_ORDERS = ('first', 'count', 'alpha')
+
+
+class CountingOptions:
+    """
+    Class to hold how WordCount counts its input: how lines are split into
+    words and whether they are counted in parallel or within a memory
+    budget
+    """
+
+    def __init__(self, tokenizer=None, workers=1, memory_budget=None):
+        """
+        Initializes the CountingOptions object
+
+        Args:
+            tokenizer (callable): Splits a line into words, as built by
+            'make_tokenizer'. Defaults to one word per stripped line
+            workers (int): Number of processes counting the words. More than
+            one splits the file into byte ranges counted in parallel
+            memory_budget (int): Approximate bytes the word counts may take
+            in memory before they are spilled to disk, or None to keep
+            every count in memory. A budget counts the words in this process
+
+        Returns:
+            None
+        """
+        self.tokenizer = tokenizer if tokenizer is not None else make_tokenizer()
+        self.workers = workers
+        self.memory_budget = memory_budget
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """
+        This function adds the counting options to a command line parser
+
+        Args:
+            parser (argparse.ArgumentParser): The parser of the program
+
+        Returns:
+            None
+        """
+        parser.add_argument('--split', choices=SPLIT_MODES, default='line',
+                            help='how lines are split into words: the whole line, on '
+                                 'whitespace, with --pattern, or on Unicode word '
+                                 'boundaries (default: line)')
+        parser.add_argument('--pattern',
+                            help='regular expression matching a word, for --split regex')
+        parser.add_argument('--casefold', action='store_true',
+                            help='count words regardless of their case')
+        parser.add_argument('--strip-punctuation', action='store_true',
+                            help='remove punctuation from both ends of every word')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='processes counting the words in parallel (default: 1)')
+        parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                            help='megabytes the word counts may take in memory before they '
+                                 'are spilled to disk; counts in a single process')
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        This function builds the counting options selected on the command
+        line
+
+        Args:
+            args (argparse.Namespace): The parsed options of 'add_arguments'
+
+        Returns:
+            CountingOptions: The selected options
+
+        Raises:
+            ValueError: If the split mode or its pattern is not valid
+        """
+        tokenizer = make_tokenizer(args.split, args.pattern, casefold=args.casefold,
+                                   strip_punctuation=args.strip_punctuation)
+        return cls(tokenizer=tokenizer, workers=args.workers,
+                   memory_budget=None if args.memory_budget is None
+                   else int(args.memory_budget * 1_048_576))
+
+
+class WordSelection:
+    """
+    Class to select the words written to the results file: the minimum
+    count of a written word, how many of the most frequent words are kept
+    and the order they are written in
+    """
+
+    def __init__(self, top=None, sort='first', min_count=1):
+        """
+        Initializes the WordSelection object
+
+        Args:
+            top (int): Number of most frequent words written, or None to
+            write every word
+            sort (str): Order of the written words, one of 'first' (order
+            of first appearance), 'count' (most frequent first) or 'alpha'
+            min_count (int): Smallest count of a written word
+
+        Returns:
+            None
+        """
+        self.top = top
+        self.sort = sort
+        self.min_count = min_count
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """
+        This function adds the word selection options to a command line
+        parser
+
+        Args:
+            parser (argparse.ArgumentParser): The parser of the program
+
+        Returns:
+            None
+        """
+        parser.add_argument('--top', type=int, default=None,
+                            help='write only the K most frequent words')
+        parser.add_argument('--sort', choices=SORT_ORDERS, default=None,
+                            help='order of the written words: first appearance, most '
+                                 'frequent first, or alphabetical (default: first, or '
+                                 'count with --top)')
+        parser.add_argument('--min-count', type=int, default=1,
+                            help='write only the words seen at least this many times '
+                                 '(default: 1)')
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        This function builds the word selection chosen on the command line
+
+        Args:
+            args (argparse.Namespace): The parsed options of 'add_arguments'
+
+        Returns:
+            WordSelection: The selected words and order
+        """
+        return cls(top=args.top, sort=args.sort or ('count' if args.top else 'first'),
+                   min_count=args.min_count)
+
+    def select_items(self, word_counts):
+        """
+        This function picks and orders the words to be written. Words below
+        the minimum count are dropped first, the top words are then taken
+        from a heap of size 'top', and ties keep their order of first
+        appearance
+
+        Args:
+            word_counts (dict): The count of each word, in order of first
+            appearance
+
+        Returns:
+            iterable: Tuples of (word, count) in output order
+        """
+        items = word_counts.items()
+        if self.min_count > 1:
+            items = ((word, count) for word, count in items if count >= self.min_count)
+        if self.top is not None:
+            ranked = heapq.nlargest(self.top, enumerate(items), key=lambda item: item[1][1])
+            if self.sort == 'first':
+                ranked.sort(key=itemgetter(0))
+            items = [item for _, item in ranked]
+            if self.sort == 'alpha':
+                items.sort(key=itemgetter(0))
+            return items
+        if self.sort == 'count':
+            return sorted(items, key=itemgetter(1), reverse=True)
+        if self.sort == 'alpha':
+            return sorted(items, key=itemgetter(0))
+        return items
+
+    def select_spilled_items(self, word_counts):
+        """
+        This function picks and orders the words to be written from a
+        SpillingCounter, with the same rules as 'select_items'. Orders other
+        than alphabetical are produced with an external sort
+
+        Args:
+            word_counts (SpillingCounter): The spilled counts
+
+        Returns:
+            iterable: Tuples of (word, count) in output order
+        """
+        entries = word_counts.iter_merged()
+        if self.min_count > 1:
+            entries = (entry for entry in entries if entry[1] >= self.min_count)
+        if self.top is not None:
+            ranked = heapq.nlargest(self.top, entries, key=lambda entry: (entry[1], -entry[2]))
+            if self.sort == 'first':
+                ranked.sort(key=itemgetter(2))
+            elif self.sort == 'alpha':
+                ranked.sort(key=itemgetter(0))
+            return [(word, count) for word, count, _ in ranked]
+        if self.sort == 'count':
+            entries = word_counts.external_sort(entries, lambda entry: (-entry[1], entry[2]))
+        elif self.sort == 'first':
+            entries = word_counts.external_sort(entries, itemgetter(2))
+        return ((word, count) for word, count, _ in entries)
 
 
 class WordCount:
@@ -16,15 +230,32 @@ class WordCount:
     Class to convert numbers from a TXT input file
     """
 
-    def __init__(self, file):
+    def __init__(self, file, options=None, selection=None, output=None, instrumentation=None):
         """
         Initializes the WordCount object
 
+        Args:
+            file (str): Path of the TXT input file
+            options (CountingOptions): How the words are split and counted.
+            Defaults to one word per line, counted in this process
+            selection (WordSelection): Which words are written and in which
+            order. Defaults to every word, in order of first appearance
+            output (OutputOptions): Results file and console echo. Defaults
+            to 'WordCountResults.txt' with every result echoed
+            instrumentation (Instrumentation): Stage timings and counters of
+            the run. Disabled by default
+
         Returns:
             None
         """
         self.file_path = file
+        self.options = options if options is not None else CountingOptions()
+        self.selection = selection if selection is not None else WordSelection()
+        self.output = output if output is not None else OutputOptions('WordCountResults.txt')
+        self.instrumentation = instrumentation if instrumentation is not None \
+            else Instrumentation()
         self.total_lines = None
+        self.skipped_lines = 0
 
     def process_txt_file(self):
         """
@@ -34,32 +265,199 @@ class WordCount:
         Returns:
             None
         """
+        with self.instrumentation.session('word_count', self.file_path):
+            if self.options.memory_budget is not None:
+                self.process_txt_bounded()
+            elif self.options.workers > 1:
+                self.process_txt_parallel()
+            else:
+                self.process_txt_serial()
+
+    def process_txt_serial(self):
+        """
+        Counts the words of the text file in this process, keeping every
+        count in memory
+
+        Returns:
+            None
+        """
+        instrumentation = self.instrumentation
+        start_time = time.time()
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
+            with LineScanner(self.file_path) as scanner:
+                with instrumentation.span('count'):
+                    self.total_lines = scanner.count_lines()
+                with instrumentation.span('count_words'):
+                    word_counts = self.count_words(scanner.iter_lines())
+                self.report_skipped_lines(self.skipped_lines)
+                self.count_input(scanner.size, sum(word_counts.values()), len(word_counts))
+
+                if word_counts:
+                    with instrumentation.span('write'):
+                        self.word_count(word_counts, start_time)
 
-                self.total_lines = self.lines_counter(lines)
-                word_list = self.store_words(lines)
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+
+    def process_txt_parallel(self):
+        """
+        Splits the text file into byte ranges aligned on line boundaries,
+        counts the words of each range in a process pool and merges the
+        partial counts in file order, so the result matches the serial mode
 
-                if word_list:
-                    self.word_count(word_list)
+        Returns:
+            None
+        """
+        instrumentation = self.instrumentation
+        start_time = time.time()
+        try:
+            byte_ranges = split_byte_ranges(self.file_path, self.options.workers * 4)
+        except FileNotFoundError:
+            print(f'File not found: {self.file_path}')
+            return
+
+        with instrumentation.span('count_words'), \
+                ProcessPoolExecutor(max_workers=self.options.workers) as executor:
+            futures = [executor.submit(count_byte_range, self.file_path, start, end,
+                                       self.options.tokenizer)
+                       for start, end in byte_ranges]
+            partials = []
+            self.total_lines = 0
+            for future in futures:
+                word_counts, total_lines, skipped_lines = future.result()
+                partials.append(word_counts)
+                self.total_lines += total_lines
+                self.skipped_lines += skipped_lines
+                self.report_skipped_lines(skipped_lines)
+            word_counts = merge_word_counts(partials, executor)
+        self.count_input(sum(end - start for start, end in byte_ranges),
+                         sum(word_counts.values()), len(word_counts))
+
+        if word_counts:
+            with instrumentation.span('write'):
+                self.word_count(word_counts, start_time)
+
+    def process_txt_bounded(self):
+        """
+        Reads the text file and counts its words within the memory budget.
+        The counts are spilled to disk as sorted runs whenever they exceed
+        the budget, and the runs are merged back to write the results
+
+        Returns:
+            None
+        """
+        instrumentation = self.instrumentation
+        start_time = time.time()
+        try:
+            with LineScanner(self.file_path, release_pages=True) as scanner, \
+                    SpillingCounter(self.options.memory_budget) as word_counts:
+                with instrumentation.span('count'):
+                    self.total_lines = scanner.count_lines()
+                with instrumentation.span('count_words'):
+                    lines = scanner.iter_lines()
+                    while True:
+                        batch = list(islice(lines, BATCH_LINES))
+                        if not batch:
+                            break
+                        word_counts.update(chain.from_iterable(map(self.line_tokens, batch)))
+                self.report_skipped_lines(self.skipped_lines)
+
+                total_words = word_counts.counted_words()
+                self.count_input(scanner.size, total_words)
+                if total_words:
+                    # Merging the spilled runs happens while the results are written
+                    with instrumentation.span('write'):
+                        self.write_results(self.selection.select_spilled_items(word_counts),
+                                           total_words, start_time)
+                instrumentation.count('spills', word_counts.spills)
 
         except FileNotFoundError:
             print(f'File not found: {self.file_path}')
 
+    def line_tokens(self, line):
+        """
+        This function splits a line into words, counting the lines without
+        any word
+
+        Args:
+            line (str|bytes): A line from the TXT input file
+
+        Returns:
+            list: The words of the line
+        """
+        tokens = self.options.tokenizer(line)
+        if not tokens:
+            self.skipped_lines += 1
+        return tokens
+
+    def count_input(self, input_bytes, total_words, distinct_words=None):
+        """
+        This function adds the input read and the words found in it to the
+        instrumentation counters
+
+        Args:
+            input_bytes (int): Bytes of input read
+            total_words (int): Number of words counted
+            distinct_words (int): Number of different words, or None when
+            they are only known once the spilled counts are merged
+
+        Returns:
+            None
+        """
+        instrumentation = self.instrumentation
+        instrumentation.count('bytes', input_bytes)
+        instrumentation.count('lines', self.total_lines)
+        instrumentation.count('words', total_words)
+        if distinct_words is not None:
+            instrumentation.count('distinct_words', distinct_words)
+        instrumentation.count('skipped', self.skipped_lines)
+
+    @staticmethod
+    def report_skipped_lines(skipped_lines):
+        """
+        This function reports the lines without any word
+
+        Args:
+            skipped_lines (int): Number of lines without any word
+
+        Returns:
+            None
+        """
+        for _ in range(skipped_lines):
+            print('Skipping empty line: ')
+
+    def count_words(self, lines):
+        """
+        This function counts the words of the given lines as they are read.
+        The words of every line are chained into a single Counter update,
+        so the counting loop runs in C. Words split from bytes are decoded
+        once each, after counting
+
+        Args:
+            lines (iterable): Lines from the TXT input file, as str or bytes
+
+        Returns:
+            Counter: The count of each word, in order of first appearance
+        """
+        word_counts = Counter()
+        word_counts.update(chain.from_iterable(map(self.line_tokens, lines)))
+        return decode_words(word_counts)
+
     @staticmethod
     def store_words(lines):
         """
         Extracts and stores numerical values from the given list of lines
 
         Args:
-            lines (list): List of lines from the TXT input file
+            lines (iterable): Lines from the TXT input file, as str or bytes
 
         Returns:
             list: List of numerical values
         """
         word_list = []
         for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
             stripped_line = line.strip()
             if stripped_line:
                 try:
@@ -143,45 +541,151 @@ class WordCount:
                 word_counts[word] = 1
         return word_counts
 
-    def word_count(self, word_list):
+    def word_count(self, word_counts, start_time):
         """
-        This function takes the input list of numbers from the TXT file
-        and calculates its statistics
+        This function writes the count of each word into the results
+        file, followed by a summary
 
         Args:
-            word_list (list): The list of numbers from the TXT file
+            word_counts (dict): The count of each word, in output order
+            start_time (float): Time when the input started to be read
 
         Returns:
-            int|float: The statistics of the input list of numbers
+            None
         """
-        start_time = time.time()
+        self.write_results(self.selection.select_items(word_counts), sum(word_counts.values()),
+                           start_time)
+
+    def write_results(self, items, total_words, start_time):
+        """
+        This function writes the selected words and their counts into the
+        results file, 'WordCountResults.txt' by default, followed by a
+        summary
+
+        Args:
+            items (iterable): Tuples of (word, count) in output order
+            total_words (int): Number of words counted in the input
+            start_time (float): Time when the input started to be read
 
+        Returns:
+            None
+        """
         output_initial_count = self.total_lines
-        output_cleaned_count = self.counter(word_list)
-        removed_elements = output_initial_count - output_cleaned_count
-        counter_output = self.word_counter(word_list)
+        removed_elements = self.skipped_lines
+        input_bytes = os.path.getsize(self.file_path)
+
+        with self.output.open_writer() as writer:
+            for word, count in items:
+                writer.write_record(f'Word: {word}, Count: {count}\n')
+            writer.flush()
+
+            end_time = time.time()
+            elapsed_time = max(end_time - start_time, 1e-9)
+
+            writer.write_summary(
+                f'\n\nTotal Initial Count: {output_initial_count}'
+                f'\nRemoved a total of {removed_elements} elements'
+                f'\nElapsed Time: {end_time - start_time} s',
+                f'\n\nTotal Initial Count: {output_initial_count}\n'
+                f'\nRemoved a total of {removed_elements} elements\n'
+                f'\nThroughput: {output_initial_count / elapsed_time:.0f} lines/s, '
+                f'{total_words / elapsed_time:.0f} words/s, '
+                f'{input_bytes / elapsed_time / 1_048_576:.1f} MB/s\n'
+                f'\nElapsed Time: {end_time - start_time} s\n')
+
+
+def count_byte_range(file_path, start, end, tokenizer):
+    """
+    Counts the words of a byte range of a TXT input file. Runs inside the
+    worker processes of the parallel mode
+
+    Args:
+        file_path (str): Path of the TXT input file
+        start (int): Offset of the first byte of the range
+        end (int): Offset just past the last byte of the range
+        tokenizer (callable): Splits a line into words
+
+    Returns:
+        tuple: The Counter of the range, its number of lines and its number
+        of lines without any word
+    """
+    word_count = WordCount(file_path, CountingOptions(tokenizer))
+    with LineScanner(file_path) as scanner:
+        word_counts = word_count.count_words(scanner.iter_lines(start, end))
+        total_lines = scanner.count_lines(start, end)
+    return word_counts, total_lines, word_count.skipped_lines
 
-        with open('WordCountResults.txt', 'w', encoding='utf-8') as file:
-            for word, count in self.count_items(counter_output):
-                print(f'Word: {word}, Count: {count}\n')
-                file.write(f'Word: {word}, Count: {count}\n')
 
-        end_time = time.time()
+def merge_pair(left, right):
+    """
+    Adds the counts of a later part of the file into an earlier one. Words
+    first seen in the later part go after the words of the earlier one
+
+    Args:
+        left (Counter): The counts of the earlier part
+        right (Counter): The counts of the later part
 
-        print(f'\n\nTotal Initial Count: {output_initial_count}')
-        print(f'\nRemoved a total of {removed_elements} elements')
-        print(f'\nElapsed Time: {end_time - start_time} s')
+    Returns:
+        Counter: The merged counts
+    """
+    left.update(right)
+    return left
 
-        with open('WordCountResults.txt', 'a', encoding='utf-8') as file:
-            file.write(f'\n\nTotal Initial Count: {output_initial_count}')
-            file.write(f'\nRemoved a total of {removed_elements} elements')
-            file.write(f'\nElapsed Time: {end_time - start_time} s')
+
+def merge_word_counts(partials, executor):
+    """
+    Merges the partial counts of consecutive byte ranges, keeping the order
+    of first appearance. Up to TREE_MERGE_THRESHOLD partials are folded
+    here; more are merged pairwise, level by level, in the process pool
+
+    Args:
+        partials (list): The Counters of the byte ranges, in file order
+        executor (ProcessPoolExecutor): The pool used for the tree merge
+
+    Returns:
+        Counter: The counts of the whole file
+    """
+    while len(partials) > TREE_MERGE_THRESHOLD:
+        futures = [executor.submit(merge_pair, partials[index], partials[index + 1])
+                   for index in range(0, len(partials) - 1, 2)]
+        carried = [partials[-1]] if len(partials) % 2 else []
+        partials = [future.result() for future in futures] + carried
+
+    word_counts = Counter()
+    for partial in partials:
+        word_counts.update(partial)
+    return word_counts
+
+
+def main():
+    """
+    Parses the command line arguments and runs the program
+
+    Returns:
+        None
+    """
+    parser = argparse.ArgumentParser(
+        prog='python3 word_count.py',
+        description='Counts the words of a TXT input file')
+    parser.add_argument('file_path', help='TXT input file with the words to count')
+    parser.add_argument('--echo', choices=ECHO_MODES, default='all',
+                        help='console echo of the results (default: all)')
+    CountingOptions.add_arguments(parser)
+    WordSelection.add_arguments(parser)
+    Instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        options = CountingOptions.from_args(args)
+    except (ValueError, re.error) as error:
+        parser.error(str(error))
+
+    data_processor = WordCount(args.file_path, options=options,
+                               selection=WordSelection.from_args(args),
+                               output=OutputOptions('WordCountResults.txt', echo=args.echo),
+                               instrumentation=Instrumentation.from_args(args))
+    data_processor.process_txt_file()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print('Usage: python3 word_count.py <file_path>')
-    else:
-        file_path = sys.argv[1]
-        data_processor = WordCount(file_path)
-        data_processor.process_txt_file()
+    main()
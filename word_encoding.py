@@ -0,0 +1,104 @@
+"""
+Word Encoding
+
+This module contains the fixed-width two's complement encoding used by
+'convert_numbers.py' when a word size is selected, and the formatting of
+integers in any base from 2 to 36. The masks and output widths of a word
+size are computed once, so encoding a number is a mask and a format call
+
+Author:
+    Julia Gabriela Pinedo (A01795315)
+"""
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+BASE_FORMATS = {2: 'b', 8: 'o', 16: 'X'}
+BASE_LABELS = {8: 'Octal', 16: 'Hex'}
+
+
+def base_label(base):
+    """
+    This function returns the name of the output field for a base
+
+    Args:
+        base (int): The base of the output
+
+    Returns:
+        str: 'Hex', 'Octal', or 'Base N' for any other base
+    """
+    return BASE_LABELS.get(base, f'Base {base}')
+
+
+def format_in_base(value, base, digits=0):
+    """
+    This function writes a non-negative integer in a base from 2 to 36
+
+    Args:
+        value (int): The non-negative integer
+        base (int): The base of the output
+        digits (int): Minimum number of digits, padded with zeros
+
+    Returns:
+        str: The digits of the integer, most significant first
+    """
+    if base in BASE_FORMATS:
+        return format(value, f'0{digits}{BASE_FORMATS[base]}')
+    output = []
+    while value:
+        value, digit = divmod(value, base)
+        output.append(DIGITS[digit])
+    return ''.join(reversed(output)).rjust(digits, '0')
+
+
+class WordEncoder:
+    """
+    Class to encode integers as two's complement words of a fixed width.
+    Every number is written with the same number of bits and digits, and
+    numbers that do not fit in the word are out of range
+    """
+
+    def __init__(self, width, base=16):
+        """
+        Initializes the WordEncoder object
+
+        Args:
+            width (int): Number of bits of the word, at least 2
+            base (int): Base of the second representation, from 2 to 36
+
+        Returns:
+            None
+        """
+        if width < 2:
+            raise ValueError(f'Word width must be at least 2 bits: {width}')
+        if not 2 <= base <= len(DIGITS):
+            raise ValueError(f'Base must be between 2 and {len(DIGITS)}: {base}')
+        self.width = width
+        self.base = base
+        self.mask = (1 << width) - 1
+        self.minimum = -(1 << (width - 1))
+        self.maximum = (1 << (width - 1)) - 1
+        self.binary_format = f'0{width}b'
+        self.digits = len(format_in_base(self.mask, base))
+
+    def in_range(self, number):
+        """
+        This function checks whether a number fits in the word
+
+        Args:
+            number (int): The number to be checked
+
+        Returns:
+            bool: True if the number can be encoded
+        """
+        return self.minimum <= number <= self.maximum
+
+    def encode(self, number):
+        """
+        This function encodes a number that fits in the word
+
+        Args:
+            number (int): The number to be encoded
+
+        Returns:
+            tuple: The binary word and its representation in the base
+        """
+        word = number & self.mask
+        return format(word, self.binary_format), format_in_base(word, self.base, self.digits)